@@ -47,6 +47,11 @@ from lollypop.database_albums import AlbumsDatabase
 from lollypop.database_artists import ArtistsDatabase
 from lollypop.database_genres import GenresDatabase
 from lollypop.database_tracks import TracksDatabase
+from lollypop.database_directories import DirectoriesDatabase
+from lollypop.database_checkpoint import CheckpointDatabase
+from lollypop.database_quarantine import QuarantineDatabase
+from lollypop.database_report import QueryPlanReport
+from lollypop.database_search import SearchDatabase
 from lollypop.playlists import Playlists
 from lollypop.radios import Radios
 from lollypop.collectionscanner import CollectionScanner
@@ -70,7 +75,6 @@ class Application(Gtk.Application):
                             self,
                             application_id='org.gnome.Lollypop',
                             flags=Gio.ApplicationFlags.HANDLES_COMMAND_LINE)
-        self.cursors = {}
         self.window = None
         self.notify = None
         self.mpd = None
@@ -96,6 +100,18 @@ class Application(Gtk.Application):
             self.add_main_option("prev", b'p', GLib.OptionFlags.NONE,
                                  GLib.OptionArg.NONE, "Go to prev track",
                                  None)
+            self.add_main_option("scan-plan", b's', GLib.OptionFlags.NONE,
+                                 GLib.OptionArg.NONE,
+                                 "Print changes a collection update would do",
+                                 None)
+            self.add_main_option("quarantine", b'q', GLib.OptionFlags.NONE,
+                                 GLib.OptionArg.NONE,
+                                 "Print files skipped by collection updates",
+                                 None)
+            self.add_main_option("query-plans", b'\0', GLib.OptionFlags.NONE,
+                                 GLib.OptionArg.NONE,
+                                 "Print query plans of database lookups",
+                                 None)
         self.connect('command-line', self._on_command_line)
         self.register(None)
         if self.get_is_remote():
@@ -126,6 +142,10 @@ class Application(Gtk.Application):
         self.artists = ArtistsDatabase()
         self.genres = GenresDatabase()
         self.tracks = TracksDatabase()
+        self.directories = DirectoriesDatabase()
+        self.checkpoint = CheckpointDatabase()
+        self.quarantine = QuarantineDatabase()
+        self.search = SearchDatabase()
         self.player = Player()
         self.scanner = CollectionScanner()
         self.art = Art()
@@ -262,6 +282,14 @@ class Application(Gtk.Application):
             self.player.next()
         elif options.contains('prev'):
             self.player.prev()
+        if options.contains('scan-plan'):
+            t = Thread(target=self._print_scan_plan)
+            t.daemon = True
+            t.start()
+        if options.contains('quarantine'):
+            print(self.quarantine.dump())
+        if options.contains('query-plans'):
+            print(QueryPlanReport(self.db).dump())
         args = app_cmd_line.get_arguments()
         if len(args) > 1:
             self.player.clear_externals()
@@ -277,6 +305,13 @@ class Application(Gtk.Application):
             self.window.present()
         return 0
 
+    def _print_scan_plan(self):
+        """
+            Print collection changes without applying them
+            @thread safe
+        """
+        print(self.scanner.get_plan().dump())
+
     def _on_entry_parsed(self, parser, uri, metadata):
         """
             Add playlist entry to external files
@@ -311,7 +346,15 @@ class Application(Gtk.Application):
             t = Thread(target=self.art.clean_all_cache)
             t.daemon = True
             t.start()
-            self.window.update_db()
+            self.window.update_db(True)
+
+    def _retry_quarantine(self, action=None, param=None):
+        """
+            Read files skipped by previous updates again
+            @param action as Gio.SimpleAction
+            @param param as GLib.Variant
+        """
+        self.scanner.retry_quarantined()
 
     def _fullscreen(self, action=None, param=None):
         """
@@ -402,6 +445,10 @@ class Application(Gtk.Application):
         self.set_accels_for_action('app.update_db', ["<Control>u"])
         self.add_action(updateAction)
 
+        retryAction = Gio.SimpleAction.new('retry_quarantine', None)
+        retryAction.connect('activate', self._retry_quarantine)
+        self.add_action(retryAction)
+
         fsAction = Gio.SimpleAction.new('fullscreen', None)
         fsAction.connect('activate', self._fullscreen)
         self.set_accels_for_action('app.fullscreen', ["F11", "<Control>m"])
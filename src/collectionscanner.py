@@ -10,18 +10,26 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-from gi.repository import GLib, GObject, Gio
+from gi.repository import GLib, GObject
 
 import os
 from gettext import gettext as _
-from threading import Thread
+from threading import Thread, current_thread
+from itertools import chain
 from time import time
 
 from lollypop.inotify import Inotify
 from lollypop.define import Lp
 from lollypop.sqlcursor import SqlCursor
-from lollypop.tagreader import ScannerTagReader
-from lollypop.utils import is_audio, is_pls, debug
+from lollypop.database_search import SearchDatabase
+from lollypop.tagreader import ScannerTagReader, TagReaderPool
+from lollypop.scanner_plan import ScanPlan, MoveDetector
+from lollypop.scanner_progress import ScanProgress
+from lollypop.scanner_scheduler import ScanScheduler
+from lollypop.scanner_walker import CollectionWalker
+from lollypop.scanner_writer import ScanWriter
+from lollypop.tagcache import TagCache
+from lollypop.utils import debug
 
 
 class CollectionScanner(GObject.GObject, ScannerTagReader):
@@ -30,10 +38,23 @@ class CollectionScanner(GObject.GObject, ScannerTagReader):
     """
     __gsignals__ = {
         'scan-finished': (GObject.SignalFlags.RUN_FIRST, None, ()),
-        'artist-update': (GObject.SignalFlags.RUN_FIRST, None, (int, int)),
-        'genre-update': (GObject.SignalFlags.RUN_FIRST, None, (int,)),
-        'album-modified': (GObject.SignalFlags.RUN_FIRST, None, (int,))
+        # [(artist id as int, album id as int)]
+        'artists-update': (GObject.SignalFlags.RUN_FIRST, None,
+                           (GObject.TYPE_PYOBJECT,)),
+        # [genre id as int]
+        'genres-update': (GObject.SignalFlags.RUN_FIRST, None,
+                          (GObject.TYPE_PYOBJECT,)),
+        # [album id as int]
+        'albums-modified': (GObject.SignalFlags.RUN_FIRST, None,
+                            (GObject.TYPE_PYOBJECT,)),
+        'library-grew': (GObject.SignalFlags.RUN_FIRST, None, (bool,))
     }
+    # Tracks written to db per transaction
+    _BATCH_SIZE = 1000
+    # On first scan, max seconds between transactions
+    _BATCH_INTERVAL = 2
+    # Min seconds between library-grew signals
+    _GREW_INTERVAL = 5
 
     def __init__(self):
         """
@@ -47,249 +68,505 @@ class CollectionScanner(GObject.GObject, ScannerTagReader):
         if Lp().settings.get_value('auto-update'):
             self._inotify = Inotify()
         self._progress = None
+        self._reporter = None
+        self._scheduler = ScanScheduler()
+        self._writer = None
+        # Files handled since last flush
+        self._batch = []
+        self._last_flush = 0
+        self._last_grew = 0
+        self._moves = None
+        self._tag_cache = None
+        self._is_empty = False
 
-    def update(self, progress):
+    def update(self, progress, full=False):
         """
             Update database
             @param progress as Gtk.Scale
+            @param full as bool, if True, list unchanged directories too
         """
         if not self.is_locked():
             progress.show()
             self._progress = progress
-            # Keep track of on file with missing codecs
-            self._missing_codecs = None
-            self.init_discover()
             paths = Lp().settings.get_music_paths()
             if not paths:
                 return
 
+            self._reporter = ScanProgress(progress)
             if Lp().notify is not None:
                 Lp().notify.send(_("Your music is updating"))
-            self._thread = Thread(target=self._scan, args=(paths,))
+            self._thread = Thread(target=self._scan, args=(paths, full))
             self._thread.daemon = True
             self._thread.start()
 
+    def update_paths(self, paths):
+        """
+            Update database for changed paths, other paths are not walked
+            @param paths as [str], files or directories, maybe deleted
+            @return False if scanner is locked
+        """
+        if self.is_locked():
+            return False
+        self._progress = None
+        self._reporter = ScanProgress(None)
+        self._thread = Thread(target=self._scan_paths, args=(paths,))
+        self._thread.daemon = True
+        self._thread.start()
+        return True
+
+    def update_sync(self, paths, full=False):
+        """
+            Update database from calling thread, without progress bar
+            @param paths as [str]
+            @param full as bool
+            @return ScanProgress
+        """
+        self._progress = None
+        self._reporter = ScanProgress(None)
+        self._thread = current_thread()
+        self._scan(paths, full)
+        reporter = self._reporter
+        self._thread = None
+        return reporter
+
+    def retry_quarantined(self):
+        """
+            Read quarantined files again
+            @return False if scanner is locked
+        """
+        if self.is_locked():
+            return False
+        filepaths = list(Lp().quarantine.get().keys())
+        if not filepaths:
+            return True
+        with SqlCursor(Lp().db) as sql:
+            Lp().quarantine.remove(filepaths)
+            sql.commit()
+        return self.update_paths(filepaths)
+
     def is_locked(self):
         """
             Return True if db locked
         """
         return self._thread is not None and self._thread.isAlive()
 
+    def get_plan(self, paths=None):
+        """
+            Compute changes a scan would apply, db is not modified
+            @param paths as [str], default to music paths
+            @return ScanPlan
+            @thread safe
+        """
+        if paths is None:
+            paths = Lp().settings.get_music_paths()
+        in_db = Lp().tracks.get_fingerprints()
+        walker = CollectionWalker(Lp().directories.get_index(), in_db)
+        (on_disk, dirs, count) = walker.walk(paths)
+        return ScanPlan(on_disk, in_db)
+
+    def get_metrics(self):
+        """
+            Get metrics for running or last scan
+            @return dict, see ScanProgress.get_metrics(), None if no scan
+        """
+        if self._reporter is None:
+            return None
+        return self._reporter.get_metrics()
+
     def stop(self):
         """
             Stop scan
         """
         self._thread = None
+        if self._reporter is not None:
+            self._reporter.stop()
         if self._progress is not None:
             self._progress.hide()
             self._progress.set_fraction(0.0)
+            self._progress.set_tooltip_text(None)
             self._progress = None
 
 #######################
 # PRIVATE             #
 #######################
-    def _get_objects_for_paths(self, paths):
-        """
-            Return all tracks/dirs for paths
-            @param paths as string
-            @return ([tracks path], [dirs path], track count)
-        """
-        tracks = []
-        track_dirs = list(paths)
-        count = 0
-        for path in paths:
-            for root, dirs, files in os.walk(path):
-                # Add dirs
-                for d in dirs:
-                    track_dirs.append(os.path.join(root, d))
-                # Add files
-                for name in files:
-                    filepath = os.path.join(root, name)
-                    try:
-                        f = Gio.File.new_for_path(filepath)
-                        if is_pls(f):
-                            pass
-                        elif is_audio(f):
-                            tracks.append(filepath)
-                            count += 1
-                        else:
-                            debug("%s not detected as a music file" % filepath)
-                    except Exception as e:
-                        print("CollectionScanner::_get_objects_for_paths: %s"
-                              % e)
-        return (tracks, track_dirs, count)
-
-    def _update_progress(self, current, total):
-        """
-            Update progress bar status
-            @param scanned items as int, total items as int
-        """
-        if self._progress is not None:
-            self._progress.set_fraction(current/total)
-
     def _finish(self):
         """
             Notify from main thread when scan finished
         """
         Lp().settings.set_value('db-mtime', GLib.Variant('i', int(time())))
+        debug("CollectionScanner::_finish():\n%s" % self._reporter.dump())
         self.stop()
         self.emit("scan-finished")
-        if self._missing_codecs is not None:
-            Lp().player.load_external(
-                                    GLib.filename_to_uri(self._missing_codecs))
+        if self._reporter.missing_codecs and Lp().player is not None:
+            filepath = self._reporter.missing_codecs[-1]
+            Lp().player.load_external(GLib.filename_to_uri(filepath))
             Lp().player.play_first_external()
 
-    def _scan(self, paths):
+    def _scan(self, paths, full):
         """
             Scan music collection for music files
             @param paths as [string], paths to scan
+            @param full as bool
             @thread safe
         """
-        self._new_albums = []
-        mtimes = Lp().tracks.get_mtimes()
-        orig_tracks = Lp().tracks.get_paths()
-        is_empty = len(orig_tracks) == 0
+        resumed = self._resume()
+        if self._thread is None:
+            return
+        # Interrupted scan was the same scan, nothing more to do
+        if resumed == paths and not full:
+            if self._inotify is not None:
+                for d in Lp().directories.get_index().keys():
+                    self._inotify.add_monitor(d)
+            GLib.idle_add(self._finish)
+            return
+
+        in_db = Lp().tracks.get_fingerprints()
+        self._is_empty = len(in_db) == 0
 
         # Add monitors on dirs
-        (new_tracks, new_dirs, count) = self._get_objects_for_paths(paths)
+        self._reporter.begin('walk')
+        walker = CollectionWalker(Lp().directories.get_index(), in_db, full)
+        (on_disk, new_dirs, count) = walker.walk(paths)
+        self._reporter.end('walk', len(new_dirs))
         if self._inotify is not None:
             for d in new_dirs:
                 self._inotify.add_monitor(d)
+            debug("CollectionScanner::_scan(): %s" %
+                  self._inotify.get_usage())
+        if self._thread is None:
+            return
+
+        self._reporter.begin('diff')
+        plan = ScanPlan(on_disk, in_db)
+        self._reporter.end('diff', len(on_disk))
+        del in_db
+        debug("CollectionScanner::_scan(): %s" % plan.dump())
+        if self._apply_plan(plan, count, walker.changed,
+                            walker.get_removed(), paths):
+            # Unmounted paths are not listed, keep their entries
+            removed = [filepath for (filepath, track_id) in plan.removed] +\
+                [old_filepath for (old_filepath, filepath, track_id)
+                 in plan.moved]
+            self._tag_cache.prune([filepath for filepath in removed
+                                   if walker.is_visited(
+                                                os.path.dirname(filepath))])
+            with SqlCursor(Lp().db) as sql:
+                Lp().quarantine.prune()
+                sql.commit()
+            GLib.idle_add(self._finish)
 
+    def _scan_paths(self, paths):
+        """
+            Scan changed paths only
+            @param paths as [str], files or directories, maybe deleted
+            @thread safe
+        """
+        generation = Lp().db.get_generation()
+        self._resume()
+        if self._thread is None:
+            return
+        in_db = Lp().tracks.get_fingerprints()
+        self._is_empty = len(in_db) == 0
+        index = Lp().directories.get_index()
+        walker = CollectionWalker(index, in_db)
+        dirs = []
+        files = []
+        gone = []
+        for path in paths:
+            if os.path.isdir(path):
+                dirs.append(path)
+            elif os.path.exists(path):
+                files.append(path)
+            else:
+                gone.append(path)
+        # Only compare tracks under changed paths
+        prefixes = tuple([path + "/" for path in dirs + gone])
+        exact = set(files + gone)
+        in_scope = {filepath: value for (filepath, value) in in_db.items()
+                    if filepath in exact or filepath.startswith(prefixes)}
+        self._reporter.begin('walk')
+        (on_disk, new_dirs, count) = walker.walk(dirs)
+        on_disk.update(walker.stat_files(files))
+        self._reporter.end('walk', len(new_dirs))
+        if self._inotify is not None:
+            for d in new_dirs:
+                self._inotify.add_monitor(d)
+        if self._thread is None:
+            return
+
+        self._reporter.begin('diff')
+        plan = ScanPlan(on_disk, in_scope)
+        self._reporter.end('diff', len(on_disk))
+        del in_db
+        debug("CollectionScanner::_scan_paths(): %s" % plan.dump())
+        prefixes = tuple([path + "/" for path in gone])
+        removed_dirs = [path for path in index.keys()
+                        if path in gone or path.startswith(prefixes)]
+        # Nothing changed in db, views don't need to be refreshed
+        if plan.is_empty() and generation == Lp().db.get_generation():
+            with SqlCursor(Lp().db) as sql:
+                Lp().directories.set_index(walker.changed)
+                Lp().directories.remove(removed_dirs)
+                sql.commit()
+            GLib.idle_add(self.stop)
+            return
+        if self._apply_plan(plan, len(on_disk), walker.changed,
+                            removed_dirs):
+            GLib.idle_add(self._finish)
+
+    def _resume(self):
+        """
+            Finish interrupted scan, if any
+            @return music paths of interrupted scan as [str],
+                    None if partial scan or no interrupted scan
+            @thread safe
+        """
+        checkpoint = Lp().checkpoint.get()
+        if checkpoint is None:
+            return None
+        (state, done) = checkpoint
+        debug("CollectionScanner::_resume(): %s files already done" %
+              len(done))
+        self._is_empty = Lp().tracks.is_empty()
+        plan = ScanPlan({}, {})
+        plan.set_state(state['plan'])
+        if self._apply_plan(plan, state['count'], state['changed_dirs'],
+                            state['removed_dirs'], state['paths'], done):
+            return state['paths']
+        return None
+
+    def _apply_plan(self, plan, count, changed_dirs, removed_dirs,
+                    paths=None, done=None):
+        """
+            Read tags and update db for plan
+            A checkpoint is saved so scan can be resumed
+            @param plan as ScanPlan
+            @param count as int, tracks on disk for progress
+            @param changed_dirs as {path as str: (mtime as int, count as int)}
+            @param removed_dirs as [str]
+            @param paths as [str], music paths, None for partial scans
+            @param done as set of str, files done by interrupted scan
+            @return False if scan has been stopped
+            @thread safe
+        """
+        resuming = done is not None
+        if not resuming:
+            done = set()
+        # Read tags in parallel, write to db from this thread
+        # Recently modified files first, most relevant music shows early
+        # Quarantined files are skipped until they change
+        quarantined = Lp().quarantine.get()
+        # Directories with unread files must be listed again on next scan
+        failed_dirs = set()
+        to_read = []
+        for filepath in plan.added + [filepath for (filepath, track_id)
+                                      in plan.modified]:
+            if filepath in done:
+                continue
+            fingerprint = quarantined.get(filepath, None)
+            if fingerprint is not None and\
+                    fingerprint[0:2] == tuple(plan.on_disk[filepath][0:2]):
+                debug("Quarantined file: %s" % filepath)
+                failed_dirs.add(os.path.dirname(filepath))
+                continue
+            to_read.append(filepath)
+        to_read.sort(key=lambda filepath: plan.on_disk[filepath][0],
+                     reverse=True)
+        self._tag_cache = TagCache(
+                Lp().settings.get_value('tag-cache-size').get_int32())
+        cached = self._tag_cache.get([(filepath, plan.on_disk[filepath])
+                                      for filepath in to_read])
+        workers = Lp().settings.get_value('scan-workers').get_int32()
+        pool = TagReaderPool(workers, self._scheduler)
+        pool.start([filepath for filepath in to_read
+                    if filepath not in cached])
+        results = chain([(filepath, fields, None)
+                         for (filepath, fields) in cached.items()],
+                        pool.get_results())
         with SqlCursor(Lp().db) as sql:
-            i = 0
-            for filepath in new_tracks:
+            self._apply_moves(plan)
+            if not resuming:
+                Lp().checkpoint.save({'plan': plan.get_state(),
+                                      'count': count,
+                                      'changed_dirs': changed_dirs,
+                                      'removed_dirs': removed_dirs,
+                                      'paths': paths})
+            sql.commit()
+            self._moves = MoveDetector(plan, Lp().tracks.get_move_infos(
+                                [track_id for (filepath, track_id)
+                                 in plan.removed + plan.modified]))
+            self._writer = ScanWriter()
+            self._batch = []
+            self._last_flush = time()
+            released = []
+            self._reporter.set_total(count, count - len(to_read))
+            self._reporter.begin('read')
+            for (filepath, fields, error) in results:
                 if self._thread is None:
-                    return
-                GLib.idle_add(self._update_progress, i, count)
+                    pool.stop()
+                    return False
+                self._reporter.add('read')
+                self._batch.append(filepath)
+                if error is not None:
+                    debug("Error scanning: %s, %s" % (filepath, error))
+                    failed_dirs.add(os.path.dirname(filepath))
+                    string = "%s" % error
+                    missing_codec = string.startswith('gst-core-error-quark')
+                    self._reporter.add_error(filepath, missing_codec)
+                    # Missing codecs may be installed, don't skip file
+                    if not missing_codec:
+                        (mtime, size, inode) = plan.on_disk[filepath]
+                        Lp().quarantine.add(filepath, mtime, size, string)
+                    continue
+                if fields is None:
+                    print("Can't get infos for ", filepath)
+                    self._reporter.add_error(filepath)
+                    failed_dirs.add(os.path.dirname(filepath))
+                    continue
+                if filepath in quarantined:
+                    released.append(filepath)
                 try:
-                    mtime = int(os.path.getmtime(filepath))
-                    if filepath not in orig_tracks:
-                        try:
-                            debug("Adding file: %s" % filepath)
-                            infos = self.get_infos(filepath)
-                            self._add2db(filepath, mtime, infos)
-                        except Exception as e:
-                            debug("Error scanning: %s, %s" % (filepath, e))
-                            string = "%s" % e
-                            if string.startswith('gst-core-error-quark'):
-                                self._missing_codecs = filepath
-                    else:
-                        # Update tags by removing song and readd it
-                        if mtime != mtimes[filepath]:
-                            debug("Adding file: %s" % filepath)
-                            infos = self.get_infos(filepath)
-                            if infos is not None:
-                                self._add2db(filepath, mtime, infos)
-                            else:
-                                print("Can't get infos for ", filepath)
-                        else:
-                            orig_tracks.remove(filepath)
-
+                    debug("Adding file: %s" % filepath)
+                    (mtime, size, inode) = plan.on_disk[filepath]
+                    if filepath not in cached:
+                        self._tag_cache.add(filepath, plan.on_disk[filepath],
+                                            fields)
+                    self._add2db(filepath, mtime, fields, size, inode)
                 except Exception as e:
                     print(ascii(filepath))
-                    print("CollectionScanner::_scan(): %s" % e)
-                i += 1
+                    print("CollectionScanner::_apply_plan(): %s" % e)
+                    failed_dirs.add(os.path.dirname(filepath))
+                pending = self._writer.get_pending()
+                if pending >= self._BATCH_SIZE or\
+                        (pending and self._is_empty and
+                         time() - self._last_flush > self._BATCH_INTERVAL):
+                    self._reporter.end('read')
+                    self._flush(sql)
+                    self._reporter.begin('read')
+            self._reporter.end('read')
+            self._flush(sql)
+            for (filepath, track_id) in self._moves.moved:
+                debug("Moved file: %s, stats from track %s" %
+                      (filepath, track_id))
 
             # Restore stats for new albums
-            if not is_empty:
-                for album_id in self._new_albums:
-                    duration = Lp().albums.get_duration(album_id, None)
-                    count = Lp().albums.get_count(album_id, None)
-                    value = Lp().albums.get_stats(duration, count)
-                    if value is not None:
-                        Lp().albums.set_popularity(album_id, value[0])
-                        Lp().albums.set_mtime(album_id, value[1])
-
-            # Clean deleted files
-            for filepath in orig_tracks:
-                track_id = Lp().tracks.get_id_by_path(filepath)
-                self._del_from_db(track_id)
+            self._reporter.begin('cleanup')
+            if not self._is_empty and self._writer.new_album_ids:
+                stats = Lp().albums.get_stats(self._writer.new_album_ids)
+                for (album_id, (popularity, mtime)) in stats.items():
+                    Lp().albums.set_popularity(album_id, popularity)
+                    Lp().albums.set_mtime(album_id, mtime)
+
+            # Clean deleted files, modified files have been readded
+            self._del_from_db([track_id for (filepath, track_id)
+                               in plan.removed + plan.modified])
+
+            # Quarantined files that have changed and are now readable
+            Lp().quarantine.remove(released)
+
+            # Directories are only indexed once their files are in db
+            Lp().directories.set_index({path: value for (path, value)
+                                        in changed_dirs.items()
+                                        if path not in failed_dirs})
+            Lp().directories.remove(removed_dirs + list(failed_dirs))
 
+            Lp().checkpoint.clear()
             sql.commit()
-        GLib.idle_add(self._finish)
+            if not plan.is_empty():
+                Lp().db.bump_generation()
+            self._reporter.end('cleanup',
+                               len(plan.removed) + len(plan.modified))
+        return True
 
-    def _add2db(self, filepath, mtime, infos):
+    def _apply_moves(self, plan):
+        """
+            Update db for moved files and missing fingerprints,
+            no tag read needed
+            @param plan as ScanPlan
+            @commit needed
+        """
+        for (old_filepath, filepath, track_id) in plan.moved:
+            debug("Moving file: %s -> %s" % (old_filepath, filepath))
+            Lp().tracks.set_path(track_id, filepath)
+            album_id = Lp().tracks.get_album_id(track_id)
+            Lp().albums.set_path(album_id, os.path.dirname(filepath))
+        for (filepath, track_id) in plan.refreshed:
+            (mtime, size, inode) = plan.on_disk[filepath]
+            Lp().tracks.set_fingerprint(track_id, size, inode)
+
+    def _add2db(self, filepath, mtime, fields, size=None, inode=None):
         """
             Add new file to db with informations
             @param filepath as string
             @param file modification time as int
-            @param infos as GstPbutils.DiscovererInfo
+            @param fields as {str: value}, see ScannerTagReader.get_fields()
+            @param file size as int
+            @param file inode as int
             @return track id as int
+            @commit needed, see _flush()
         """
-        tags = infos.get_tags()
-
-        title = self.get_title(tags, filepath)
-        artists = self.get_artists(tags)
-        sortname = self.get_artist_sortname(tags)
-        album_artist = self.get_album_artist(tags)
-        album_name = self.get_album_name(tags)
-        genres = self.get_genres(tags)
-        discnumber = self.get_discnumber(tags)
-        tracknumber = self.get_tracknumber(tags)
-        year = self.get_year(tags)
-        duration = int(infos.get_duration()/1000000000)
-
-        (artist_ids, new_artist_ids) = self.add_artists(artists,
-                                                        album_artist,
-                                                        sortname)
-        (album_artist_id, new) = self.add_album_artist(album_artist)
-        if new:
-            new_artist_ids.append(album_artist_id)
-
-        # Check for album artist, if none, use first available artist
-        no_album_artist = False
-        if album_artist_id is None:
-            album_artist_id = artist_ids[0]
-            no_album_artist = True
-
-        (album_id, new) = self.add_album(album_name, album_artist_id,
-                                         no_album_artist, year, filepath, 0,
-                                         mtime)
-        if new:
-            self._new_albums.append(album_id)
-
-        (genre_ids, new_genre_ids) = self.add_genres(genres, album_id)
-
+        duration = fields['duration']
         # Restore stats
-        value = Lp().tracks.get_stats(filepath, duration)
+        value = self._moves.get_stats(filepath, fields, size)
+        if value is None and not self._is_empty:
+            value = Lp().tracks.get_stats(filepath, duration)
         if value is None:
             popularity = 0
             ltime = 0
         else:
             popularity = value[0]
             ltime = value[1]
-        # Add track to db
-        track_id = Lp().tracks.add(title, filepath, duration,
-                                   tracknumber, discnumber,
-                                   album_id, year, popularity, ltime, mtime)
-        self.update_track(track_id, artist_ids, genre_ids)
-
-        # Notify about new artists/genres
-        if new_genre_ids or new_artist_ids:
-            with SqlCursor(Lp().db) as sql:
-                sql.commit()
-            for genre_id in new_genre_ids:
-                GLib.idle_add(self.emit, 'genre-update', genre_id)
-            for artist_id in new_artist_ids:
-                GLib.idle_add(self.emit, 'artist-update', artist_id, album_id)
-        return track_id
-
-    def _del_from_db(self, track_id):
-        """
-            Delete track from db
-            @param track_id as int
-        """
-        album_id = Lp().tracks.get_album_id(track_id)
-        genre_ids = Lp().tracks.get_genre_ids(track_id)
-        album_artist_id = Lp().albums.get_artist_id(album_id)
-        artist_ids = Lp().tracks.get_artist_ids(track_id)
-        Lp().tracks.remove(track_id)
-        Lp().tracks.clean(track_id)
-        modified = Lp().albums.clean(album_id)
-        if modified:
-            GLib.idle_add(self.emit, 'album-modified', album_id)
-        for artist_id in [album_artist_id] + artist_ids:
-            Lp().artists.clean(artist_id)
-        for genre_id in genre_ids:
-            Lp().genres.clean(genre_id)
+        return self._writer.add(fields['title'], filepath, duration,
+                                fields['tracknumber'], fields['discnumber'],
+                                fields['year'], fields['artists'],
+                                fields['sortname'], fields['album_artist'],
+                                fields['album_name'], fields['genres'],
+                                popularity, ltime, mtime, size, inode)
+
+    def _flush(self, sql):
+        """
+            Write pending tracks to db and commit,
+            then notify about new artists/genres
+            @param sql as sqlite cursor
+        """
+        self._reporter.begin('write')
+        count = self._writer.get_pending()
+        (artist_signals, genre_signals) = self._writer.flush()
+        Lp().checkpoint.add_done(self._batch)
+        self._batch = []
+        sql.commit()
+        if count:
+            Lp().db.bump_generation()
+        self._last_flush = time()
+        self._tag_cache.flush()
+        self._reporter.end('write', count)
+        # One main loop callback per batch
+        if genre_signals:
+            GLib.idle_add(self.emit, 'genres-update', genre_signals)
+        if artist_signals:
+            GLib.idle_add(self.emit, 'artists-update', artist_signals)
+        # Coalesced, scan-finished will follow last one
+        if count and time() - self._last_grew > self._GREW_INTERVAL:
+            self._last_grew = time()
+            GLib.idle_add(self.emit, 'library-grew', self._is_empty)
+
+    def _del_from_db(self, track_ids):
+        """
+            Delete tracks from db, then orphaned albums, artists and genres
+            @param track_ids as [int]
+            @commit needed
+        """
+        if not track_ids:
+            return
+        (deltas, artist_ids, genre_ids) = Lp().tracks.remove_many(track_ids)
+        Lp().albums.update_signatures(deltas)
+        (album_ids, album_artist_ids) = Lp().albums.clean_many(
+                                                        list(deltas.keys()))
+        Lp().artists.clean_many(artist_ids + album_artist_ids)
+        Lp().genres.clean_many(genre_ids)
+        Lp().search.remove(SearchDatabase.TRACK, track_ids)
+        Lp().search.remove(SearchDatabase.ALBUM, list(deltas.keys()))
+        Lp().search.remove(SearchDatabase.ARTIST,
+                           artist_ids + album_artist_ids)
+        if album_ids:
+            GLib.idle_add(self.emit, 'albums-modified', album_ids)
@@ -16,6 +16,7 @@ from threading import Thread, Lock
 from gettext import gettext as _
 
 from lollypop.define import Lp, Type
+from lollypop.objects import Album
 from lollypop.selectionlist import SelectionList
 from lollypop.view_container import ViewContainer
 from lollypop.view_albums import AlbumsView
@@ -64,7 +65,9 @@ class Loader(Thread):
             if active:
                 active.invalidate()
             Loader.active[self._view] = self
-        result = self._target()
+        # Don't wait for a running scan
+        with Lp().db.snapshot():
+            result = self._target()
         if not self.is_invalidated():
             if self._on_finished:
                 GLib.idle_add(self._on_finished, (result))
@@ -87,6 +90,8 @@ class Container:
         self._devices = {}
         self._devices_index = Type.DEVICES
         self._show_genres = Lp().settings.get_value('show-genres')
+        # Library generation shown by lists
+        self._generation = Lp().db.get_generation()
         self._stack = ViewContainer(500)
         self._stack.show()
 
@@ -105,20 +110,21 @@ class Container:
         Lp().playlists.connect('playlists-changed',
                                self._update_playlists)
 
-    def update_db(self):
+    def update_db(self, full=False):
         """
             Update db at startup only if needed
+            @param full as bool, if True, do not trust directories index
         """
         # Stop previous scan
         if Lp().scanner.is_locked():
             Lp().scanner.stop()
-            GLib.timeout_add(250, self.update_db)
+            GLib.timeout_add(250, self.update_db, full)
         else:
             # Something (device manager) is using progress bar
             progress = None
             if not self._progress.is_visible():
                 progress = self._progress
-            Lp().scanner.update(progress)
+            Lp().scanner.update(progress, full)
 
     def get_genre_id(self):
         """
@@ -319,31 +325,34 @@ class Container:
 
         return (list_one_id, list_two_id)
 
-    def _add_genre(self, scanner, genre_id):
+    def _add_genres(self, scanner, genre_ids):
         """
-            Add genre to genre list
+            Add genres to genre list
             @param scanner as CollectionScanner
-            @param genre id as int
+            @param genre ids as [int]
         """
         if self._show_genres:
-            genre_name = Lp().genres.get_name(genre_id)
-            self._list_one.add_value((genre_id, genre_name))
+            self._list_one.add_values([(genre_id,
+                                        Lp().genres.get_name(genre_id))
+                                       for genre_id in genre_ids])
 
-    def _add_artist(self, scanner, artist_id, album_id):
+    def _add_artists(self, scanner, artists):
         """
-            Add artist to artist list
+            Add artists to artist list
             @param scanner as CollectionScanner
-            @param artist id as int
-            @param album id as int
+            @param artists as [(artist id as int, album id as int)]
         """
-        artist_name = Lp().artists.get_name(artist_id)
         if self._show_genres:
-            genre_ids = Lp().albums.get_genre_ids(album_id)
-            genre_ids.append(Type.ALL)
-            if self._list_one.get_selected_id() in genre_ids:
-                self._list_two.add_value((artist_id, artist_name))
+            selected_id = self._list_one.get_selected_id()
+            artists = [(artist_id, album_id) for (artist_id, album_id)
+                       in artists if selected_id == Type.ALL or
+                       selected_id in Lp().albums.get_genre_ids(album_id)]
+            selection_list = self._list_two
         else:
-            self._list_one.add_value((artist_id, artist_name))
+            selection_list = self._list_one
+        selection_list.add_values([(artist_id,
+                                    Lp().artists.get_name(artist_id))
+                                   for (artist_id, album_id) in artists])
 
     def _setup_scanner(self):
         """
@@ -351,8 +360,23 @@ class Container:
             @return True if hard scan is running
         """
         Lp().scanner.connect('scan-finished', self.on_scan_finished)
-        Lp().scanner.connect('genre-update', self._add_genre)
-        Lp().scanner.connect('artist-update', self._add_artist)
+        Lp().scanner.connect('genres-update', self._add_genres)
+        Lp().scanner.connect('artists-update', self._add_artists)
+        Lp().scanner.connect('library-grew', self._on_library_grew)
+
+    def _on_library_grew(self, scanner, initial):
+        """
+            Fill visible albums view on initial scan if still empty
+            Lists get new items from genres-update/artists-update,
+            user selection and scroll position are kept
+            @param scanner as CollectionScanner
+            @param initial as bool, True if db was empty
+        """
+        if not initial:
+            return
+        view = self._stack.get_visible_child()
+        if isinstance(view, AlbumsView) and view.is_empty():
+            self.reload_view()
 
     def _update_playlists(self, playlists, playlist_id):
         """
@@ -370,9 +394,13 @@ class Container:
 
     def _update_lists(self, updater=None):
         """
-            Update lists
+            Update lists, if library changed since last update
             @param updater as GObject
         """
+        generation = Lp().db.get_generation()
+        if updater is not None and generation == self._generation:
+            return
+        self._generation = generation
         self._update_list_one(updater)
         self._update_list_two(updater)
 
@@ -528,7 +556,7 @@ class Container:
                 albums = Lp().albums.get_ids(artist_id, None)
             else:
                 albums = Lp().albums.get_ids(artist_id, genre_id)
-            return albums
+            return Album.from_ids(albums, genre_id)
 
         view = ArtistView(artist_id, genre_id)
         loader = Loader(target=load, view=view)
@@ -565,7 +593,7 @@ class Container:
                 if Lp().settings.get_value('show-compilations'):
                     albums = Lp().albums.get_compilations(genre_id)
                 albums += Lp().albums.get_ids(None, genre_id)
-            return albums
+            return Album.from_ids(albums)
 
         view = AlbumsView(genre_id, is_compilation)
         loader = Loader(target=load, view=view)
@@ -16,7 +16,7 @@ from gi.repository import GLib
 
 from lollypop.define import Lp
 from lollypop.database_upgrade import DatabaseUpgrade
-from lollypop.sqlcursor import SqlCursor
+from lollypop.sqlcursor import SqlCursor, SqlSnapshot
 
 
 class Database:
@@ -39,6 +39,17 @@ class Database:
                         path TEXT NOT NULL,
                         popularity INT NOT NULL,
                         mtime INT NOT NULL)'''
+    # Track count, total duration and normalised name, used to restore
+    # stats of albums readded by scanner
+    create_album_signatures = '''CREATE TABLE album_signatures (
+                                    album_id INT NOT NULL UNIQUE,
+                                    name TEXT NOT NULL,
+                                    count INT NOT NULL,
+                                    duration INT NOT NULL)'''
+    create_album_signatures_index = '''CREATE INDEX idx_album_signatures
+                                       ON album_signatures(name,
+                                                           count,
+                                                           duration)'''
     create_artists = '''CREATE TABLE artists (id INTEGER PRIMARY KEY,
                                               name TEXT NOT NULL,
                                               sortname TEXT NOT NULL)'''
@@ -57,7 +68,12 @@ class Database:
                         year INT,
                         popularity INT NOT NULL,
                         ltime INT,
-                        mtime INT)'''
+                        mtime INT,
+                        size INT,
+                        inode INT,
+                        basename TEXT)'''
+    create_tracks_basename = '''CREATE INDEX idx_tracks_basename
+                                ON tracks(basename, duration)'''
     create_track_artists = '''CREATE TABLE track_artists (
                                                 track_id INT NOT NULL,
                                                 artist_id INT NOT NULL)'''
@@ -65,10 +81,67 @@ class Database:
                                                 track_id INT NOT NULL,
                                                 genre_id INT NOT NULL)'''
 
+    create_directories = '''CREATE TABLE directories (
+                                                path TEXT NOT NULL UNIQUE,
+                                                mtime INT NOT NULL,
+                                                count INT NOT NULL)'''
+    create_scan_checkpoint = '''CREATE TABLE scan_checkpoint (
+                                                state TEXT NOT NULL)'''
+    create_scan_done = '''CREATE TABLE scan_done (filepath TEXT NOT NULL)'''
+    # Full text index, see SearchDatabase
+    create_search = '''CREATE VIRTUAL TABLE search USING fts5(
+                            name, artist, album,
+                            tokenize='unicode61 remove_diacritics 1',
+                            prefix='2 3')'''
+    # Lookup indexes, unique junction indexes prevent duplicated rows
+    create_indexes = [
+        '''CREATE INDEX idx_tracks_filepath ON tracks(filepath)''',
+        '''CREATE INDEX idx_tracks_album_id
+           ON tracks(album_id, discnumber, tracknumber)''',
+        '''CREATE INDEX idx_albums_artist_id ON albums(artist_id)''',
+        '''CREATE INDEX idx_artists_name ON artists(name)''',
+        '''CREATE INDEX idx_genres_name ON genres(name)''',
+        '''CREATE UNIQUE INDEX idx_track_artists
+           ON track_artists(track_id, artist_id)''',
+        '''CREATE INDEX idx_track_artists_artist_id
+           ON track_artists(artist_id)''',
+        '''CREATE UNIQUE INDEX idx_track_genres
+           ON track_genres(track_id, genre_id)''',
+        '''CREATE INDEX idx_track_genres_genre_id
+           ON track_genres(genre_id)''',
+        '''CREATE UNIQUE INDEX idx_album_genres
+           ON album_genres(album_id, genre_id)''',
+        '''CREATE INDEX idx_album_genres_genre_id
+           ON album_genres(genre_id)''']
+    create_quarantine = '''CREATE TABLE quarantine (
+                                                filepath TEXT NOT NULL UNIQUE,
+                                                mtime INT NOT NULL,
+                                                size INT NOT NULL,
+                                                reason TEXT NOT NULL,
+                                                ctime INT NOT NULL)'''
+
+    # Prepared statements cached per connection
+    _CACHED_STATEMENTS = 256
+
     def __init__(self):
         """
             Create database tables or manage update if needed
         """
+        # Bumped by scanner on each change
+        self._generation = 0
+        settings = Lp().settings
+        # Connections share one WAL journal, readers don't wait for writer
+        self._pragmas = [
+            "PRAGMA journal_mode=WAL",
+            "PRAGMA synchronous=%s" %
+            settings.get_value('db-synchronous').get_string(),
+            "PRAGMA temp_store=%s" %
+            settings.get_value('db-temp-store').get_string(),
+            # Negative value is in KiB
+            "PRAGMA cache_size=-%s" %
+            settings.get_value('db-cache-size').get_int32(),
+            "PRAGMA mmap_size=%s" %
+            (settings.get_value('db-mmap-size').get_int32() * 1024 * 1024)]
         if os.path.exists(self.DB_PATH):
             with SqlCursor(self) as sql:
                 db_version = Lp().settings.get_value('db-version').get_int32()
@@ -83,21 +156,67 @@ class Database:
                 # Create db schema
                 with SqlCursor(self) as sql:
                     sql.execute(self.create_albums)
+                    sql.execute(self.create_album_signatures)
+                    sql.execute(self.create_album_signatures_index)
                     sql.execute(self.create_artists)
                     sql.execute(self.create_genres)
                     sql.execute(self.create_album_genres)
                     sql.execute(self.create_tracks)
+                    sql.execute(self.create_tracks_basename)
                     sql.execute(self.create_track_artists)
                     sql.execute(self.create_track_genres)
+                    sql.execute(self.create_directories)
+                    sql.execute(self.create_scan_checkpoint)
+                    sql.execute(self.create_scan_done)
+                    sql.execute(self.create_quarantine)
+                    for index in self.create_indexes:
+                        sql.execute(index)
+                    try:
+                        sql.execute(self.create_search)
+                    except Exception as e:
+                        # No FTS5 support, search uses LIKE queries
+                        print("Database::__init__(): %s" % e)
                     sql.commit()
+                    # Fresh schema, no upgrade needed
+                    upgrade = DatabaseUpgrade(0, self)
+                    Lp().settings.set_value('db-version',
+                                            GLib.Variant('i',
+                                                         upgrade.count()))
             except:
                 print("Database::__init__(): %s" % self.LOCAL_PATH)
 
     def get_cursor(self):
         """
-            Return a new sqlite cursor
+            Return a new sqlite cursor, SqlCursor keeps one per thread
         """
         try:
-            return sqlite3.connect(self.DB_PATH, 600.0)
+            sql = sqlite3.connect(self.DB_PATH, 600.0,
+                                  cached_statements=self._CACHED_STATEMENTS)
+            for pragma in self._pragmas:
+                sql.execute(pragma)
+            return sql
         except:
             exit(-1)
+
+    def snapshot(self):
+        """
+            Get a read only snapshot for calling thread:
+                with Lp().db.snapshot() as sql
+            @return SqlSnapshot
+        """
+        return SqlSnapshot(self, self._generation)
+
+    def get_generation(self):
+        """
+            Get library generation, views loaded with an older
+            generation are outdated
+            @return int
+        """
+        return self._generation
+
+    def bump_generation(self):
+        """
+            Mark library as changed, committed changes are visible
+            @thread safe, only called by scanner thread
+        """
+        self._generation += 1
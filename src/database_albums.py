@@ -59,11 +59,9 @@ class AlbumsDatabase:
             @warning: commit needed
         """
         with SqlCursor(Lp().db) as sql:
-            genres = self.get_genre_ids(album_id)
-            if genre_id not in genres:
-                sql.execute("INSERT INTO "
-                            "album_genres (album_id, genre_id)"
-                            "VALUES (?, ?)", (album_id, genre_id))
+            sql.execute("INSERT OR IGNORE INTO "
+                        "album_genres (album_id, genre_id)"
+                        "VALUES (?, ?)", (album_id, genre_id))
 
     def set_artist_id(self, album_id, artist_id):
         """
@@ -254,6 +252,35 @@ class AlbumsDatabase:
                                   WHERE album_id=?", (album_id,))
             return list(itertools.chain(*result))
 
+    def get_rows(self, album_ids):
+        """
+            Get albums fields, see Album.from_row()
+            @param album_ids as [int]
+            @return [(album id as int, name as str, artist id as int,
+                      artist name as str, year as str)], in album_ids order
+        """
+        rows = {}
+        with SqlCursor(Lp().db) as sql:
+            # Stay under SQLITE_MAX_VARIABLE_NUMBER
+            for i in range(0, len(album_ids), 500):
+                chunk = album_ids[i:i + 500]
+                result = sql.execute("SELECT albums.rowid, albums.name,\
+                                      albums.artist_id, artists.name,\
+                                      albums.year\
+                                      FROM albums LEFT JOIN artists\
+                                      ON artists.rowid=albums.artist_id\
+                                      WHERE albums.rowid IN (%s)" %
+                                     ", ".join(["?"] * len(chunk)), chunk)
+                for (album_id, name, artist_id, artist_name, year) in result:
+                    rows[album_id] = (album_id,
+                                      _("Unknown") if name is None else name,
+                                      artist_id,
+                                      _("Compilation") if artist_name is None
+                                      else artist_name,
+                                      str(year) if year else "")
+        return [rows[album_id] for album_id in album_ids
+                if album_id in rows]
+
     def get_name(self, album_id):
         """
             Get album name for album id
@@ -698,36 +725,103 @@ class AlbumsDatabase:
                 return v[0]
             return 0
 
-    def get_stats(self, duration, count):
-        """
-            Get stats for album with same duration and track count
-            @param path as str
-            @param duration as int
-            @return (popularity, mtime) as (int, int)
-        """
-        with SqlCursor(Lp().db) as sql:
-            sql.execute("CREATE TEMP TABLE stats (album_id INT,\
-                                                  count INT,\
-                                                  duration INT)")
-            sql.execute("INSERT INTO stats (album_id, count, duration)\
-                            SELECT album_id,\
-                                   COUNT(1),\
-                                   SUM(tracks.duration)\
-                            FROM tracks GROUP BY album_id")
-            result = sql.execute("SELECT album_id\
-                                  FROM stats\
-                                  WHERE count=? and duration=?",
-                                 (count, duration))
-            v = result.fetchone()
-            ret = None
-            if v is not None:
-                result = sql.execute("SELECT popularity, mtime\
-                                      FROM albums\
-                                      WHERE rowid=?", (v[0],))
-                v = result.fetchone()
-                if v is not None:
-                    ret = v
-            return ret
+    def get_stats(self, album_ids):
+        """
+            Get stats of other albums with same signature
+            @param album_ids as [int]
+            @return {album id as int: (popularity as int, mtime as int)}
+        """
+        stats = {}
+        with SqlCursor(Lp().db) as sql:
+            # Stay under SQLITE_MAX_VARIABLE_NUMBER
+            for i in range(0, len(album_ids), 400):
+                chunk = album_ids[i:i + 400]
+                filters = ", ".join(["?"] * len(chunk))
+                result = sql.execute("SELECT new.album_id,\
+                                      albums.popularity, albums.mtime\
+                                      FROM album_signatures AS new,\
+                                      album_signatures AS old, albums\
+                                      WHERE new.album_id IN (%s)\
+                                      AND old.name=new.name\
+                                      AND old.count=new.count\
+                                      AND old.duration=new.duration\
+                                      AND old.album_id NOT IN (%s)\
+                                      AND albums.rowid=old.album_id" %
+                                     (filters, filters), chunk + chunk)
+                for (album_id, popularity, mtime) in result:
+                    if album_id not in stats:
+                        stats[album_id] = (popularity, mtime)
+        return stats
+
+    def update_signatures(self, deltas, names=None):
+        """
+            Update album signatures
+            @param deltas as {album id as int: (count as int,
+                                                duration as int)}
+            @param names as {album id as int: name as str}, new albums
+            @warning commit needed
+        """
+        if names is None:
+            names = {}
+        with SqlCursor(Lp().db) as sql:
+            sql.executemany("INSERT OR IGNORE INTO album_signatures\
+                             (album_id, name, count, duration)\
+                             VALUES (?, ?, 0, 0)",
+                            [(album_id, name.strip().lower())
+                             for (album_id, name) in names.items()])
+            sql.executemany("UPDATE album_signatures\
+                             SET count=count+?, duration=duration+?\
+                             WHERE album_id=?",
+                            [(count, duration, album_id)
+                             for (album_id, (count, duration))
+                             in deltas.items()])
+
+    def clean_many(self, album_ids):
+        """
+            Clean database for album ids with a few set based statements
+            @param album_ids as [int]
+            @return (modified album ids as [int],
+                     artist ids of removed albums as [int])
+            @warning commit needed
+        """
+        with SqlCursor(Lp().db) as sql:
+            sql.execute("CREATE TEMP TABLE IF NOT EXISTS cleaned_albums (\
+                            album_id INTEGER PRIMARY KEY)")
+            sql.execute("DELETE FROM cleaned_albums")
+            sql.executemany("INSERT OR IGNORE INTO cleaned_albums\
+                             (album_id) VALUES (?)",
+                            [(album_id,) for album_id in album_ids])
+            # Genres without tracks for album
+            orphaned = "album_genres.album_id IN (\
+                            SELECT album_id FROM cleaned_albums)\
+                        AND NOT EXISTS (\
+                            SELECT 1 FROM tracks, track_genres\
+                            WHERE tracks.album_id=album_genres.album_id\
+                            AND track_genres.track_id=tracks.rowid\
+                            AND track_genres.genre_id=album_genres.genre_id)"
+            result = sql.execute("SELECT DISTINCT album_id FROM album_genres\
+                                  WHERE %s" % orphaned)
+            modified = set([row[0] for row in result])
+            sql.execute("DELETE FROM album_genres WHERE %s" % orphaned)
+            # Albums without tracks
+            result = sql.execute("SELECT rowid, artist_id FROM albums\
+                                  WHERE rowid IN (\
+                                    SELECT album_id FROM cleaned_albums)\
+                                  AND NOT EXISTS (\
+                                    SELECT 1 FROM tracks\
+                                    WHERE tracks.album_id=albums.rowid)")
+            removed = list(result)
+            sql.executemany("DELETE FROM albums WHERE rowid=?",
+                            [(album_id,) for (album_id, artist_id)
+                             in removed])
+            sql.executemany("DELETE FROM album_signatures WHERE album_id=?",
+                            [(album_id,) for (album_id, artist_id)
+                             in removed])
+            sql.execute("DELETE FROM cleaned_albums")
+            modified |= set([album_id for (album_id, artist_id) in removed])
+            return (list(modified),
+                    list(set([artist_id for (album_id, artist_id)
+                              in removed])))
 
     def clean(self, album_id):
         """
@@ -763,4 +857,6 @@ class AlbumsDatabase:
             if not v:
                 ret = True
                 sql.execute("DELETE FROM albums WHERE rowid=?", (album_id,))
+                sql.execute("DELETE FROM album_signatures\
+                             WHERE album_id=?", (album_id,))
             return ret
@@ -196,6 +196,29 @@ class ArtistsDatabase:
                 return v[0]
             return 0
 
+    def clean_many(self, artist_ids):
+        """
+            Remove artists without albums and tracks
+            @param artist_ids as [int]
+            @warning commit needed
+        """
+        with SqlCursor(Lp().db) as sql:
+            sql.execute("CREATE TEMP TABLE IF NOT EXISTS cleaned_artists (\
+                            artist_id INTEGER PRIMARY KEY)")
+            sql.execute("DELETE FROM cleaned_artists")
+            sql.executemany("INSERT OR IGNORE INTO cleaned_artists\
+                             (artist_id) VALUES (?)",
+                            [(artist_id,) for artist_id in artist_ids])
+            sql.execute("DELETE FROM artists WHERE rowid IN (\
+                            SELECT artist_id FROM cleaned_artists)\
+                         AND NOT EXISTS (\
+                            SELECT 1 FROM albums\
+                            WHERE albums.artist_id=artists.rowid)\
+                         AND NOT EXISTS (\
+                            SELECT 1 FROM track_artists\
+                            WHERE track_artists.artist_id=artists.rowid)")
+            sql.execute("DELETE FROM cleaned_artists")
+
     def clean(self, artist_id):
         """
             Clean database for artist id
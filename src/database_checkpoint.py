@@ -0,0 +1,79 @@
+# Copyright (c) 2014-2015 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import json
+
+from lollypop.sqlcursor import SqlCursor
+from lollypop.define import Lp
+
+
+class CheckpointDatabase:
+    """
+        State of running scan, so an interrupted scan can be resumed:
+            - state saved before reading tags
+            - files committed by each batch, in batch transaction
+    """
+
+    def __init__(self):
+        """
+            Init checkpoint database object
+        """
+        pass
+
+    def get(self):
+        """
+            Get saved scan
+            @return (state as dict, done files as set) or None
+        """
+        with SqlCursor(Lp().db) as sql:
+            result = sql.execute("SELECT state FROM scan_checkpoint")
+            v = result.fetchone()
+            if v is None:
+                return None
+            try:
+                state = json.loads(v[0])
+            except Exception as e:
+                print("CheckpointDatabase::get(): %s" % e)
+                return None
+            result = sql.execute("SELECT filepath FROM scan_done")
+            return (state, set([row[0] for row in result]))
+
+    def save(self, state):
+        """
+            Save scan state, forget done files
+            @param state as dict, json serializable
+            @warning: commit needed
+        """
+        with SqlCursor(Lp().db) as sql:
+            sql.execute("DELETE FROM scan_checkpoint")
+            sql.execute("DELETE FROM scan_done")
+            sql.execute("INSERT INTO scan_checkpoint (state) VALUES (?)",
+                        (json.dumps(state),))
+
+    def add_done(self, filepaths):
+        """
+            Mark files as done
+            @param filepaths as [str]
+            @warning: commit needed
+        """
+        with SqlCursor(Lp().db) as sql:
+            sql.executemany("INSERT INTO scan_done (filepath) VALUES (?)",
+                            [(filepath,) for filepath in filepaths])
+
+    def clear(self):
+        """
+            Forget saved scan
+            @warning: commit needed
+        """
+        with SqlCursor(Lp().db) as sql:
+            sql.execute("DELETE FROM scan_checkpoint")
+            sql.execute("DELETE FROM scan_done")
@@ -0,0 +1,70 @@
+# Copyright (c) 2014-2015 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from lollypop.sqlcursor import SqlCursor
+from lollypop.define import Lp
+
+
+class DirectoriesDatabase:
+    """
+        Directories index used by collection scanner
+        to skip unchanged directories
+    """
+
+    def __init__(self):
+        """
+            Init directories database object
+        """
+        pass
+
+    def get_index(self):
+        """
+            Get all indexed directories
+            @return {path as str: (mtime as int, entries count as int)}
+        """
+        with SqlCursor(Lp().db) as sql:
+            result = sql.execute("SELECT path, mtime, count FROM directories")
+            return {row[0]: (row[1], row[2]) for row in result}
+
+    def set_index(self, entries):
+        """
+            Add or update directories
+            @param entries as {path as str: (mtime as int, count as int)}
+            @warning: commit needed
+        """
+        with SqlCursor(Lp().db) as sql:
+            sql.executemany("INSERT OR REPLACE INTO directories\
+                             (path, mtime, count) VALUES (?, ?, ?)",
+                            [(path, mtime, count) for (path, (mtime, count))
+                             in entries.items()])
+
+    def remove(self, paths):
+        """
+            Remove directories from index
+            @param paths as [str]
+            @warning: commit needed
+        """
+        with SqlCursor(Lp().db) as sql:
+            sql.executemany("DELETE FROM directories WHERE path=?",
+                            [(path,) for path in paths])
+
+    def count(self):
+        """
+            Count indexed directories
+            @return int
+        """
+        with SqlCursor(Lp().db) as sql:
+            result = sql.execute("SELECT COUNT(1) FROM directories")
+            v = result.fetchone()
+            if v is not None:
+                return v[0]
+            return 0
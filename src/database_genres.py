@@ -112,6 +112,26 @@ class GenresDatabase:
                                   ORDER BY name COLLATE NOCASE")
             return list(itertools.chain(*result))
 
+    def clean_many(self, genre_ids):
+        """
+            Remove genres without tracks
+            @param genre_ids as [int]
+            @warning commit needed
+        """
+        with SqlCursor(Lp().db) as sql:
+            sql.execute("CREATE TEMP TABLE IF NOT EXISTS cleaned_genres (\
+                            genre_id INTEGER PRIMARY KEY)")
+            sql.execute("DELETE FROM cleaned_genres")
+            sql.executemany("INSERT OR IGNORE INTO cleaned_genres\
+                             (genre_id) VALUES (?)",
+                            [(genre_id,) for genre_id in genre_ids])
+            sql.execute("DELETE FROM genres WHERE rowid IN (\
+                            SELECT genre_id FROM cleaned_genres)\
+                         AND NOT EXISTS (\
+                            SELECT 1 FROM track_genres\
+                            WHERE track_genres.genre_id=genres.rowid)")
+            sql.execute("DELETE FROM cleaned_genres")
+
     def clean(self, genre_id):
         """
             Clean database for genre id
@@ -0,0 +1,89 @@
+# Copyright (c) 2014-2015 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+from time import time
+
+from lollypop.sqlcursor import SqlCursor
+from lollypop.define import Lp
+
+
+class QuarantineDatabase:
+    """
+        Files skipped by collection scanner because reading them failed
+        or timed out, keyed by fingerprint: a file is read again once
+        it changes on disk
+    """
+
+    def __init__(self):
+        """
+            Init quarantine database object
+        """
+        pass
+
+    def get(self):
+        """
+            Get quarantined files
+            @return {filepath as str: (mtime as int, size as int,
+                                       reason as str, ctime as int)}
+        """
+        with SqlCursor(Lp().db) as sql:
+            result = sql.execute("SELECT filepath, mtime, size, reason, ctime\
+                                  FROM quarantine")
+            return {row[0]: row[1:] for row in result}
+
+    def add(self, filepath, mtime, size, reason):
+        """
+            Quarantine file
+            @param filepath as str
+            @param mtime as int
+            @param size as int
+            @param reason as str
+            @warning: commit needed
+        """
+        with SqlCursor(Lp().db) as sql:
+            sql.execute("INSERT OR REPLACE INTO quarantine\
+                         (filepath, mtime, size, reason, ctime)\
+                         VALUES (?, ?, ?, ?, ?)",
+                        (filepath, mtime, size, reason, int(time())))
+
+    def remove(self, filepaths):
+        """
+            Release files
+            @param filepaths as [str]
+            @warning: commit needed
+        """
+        with SqlCursor(Lp().db) as sql:
+            sql.executemany("DELETE FROM quarantine WHERE filepath=?",
+                            [(filepath,) for filepath in filepaths])
+
+    def prune(self):
+        """
+            Release deleted files, files in missing directories are kept
+            so unmounted paths keep them
+            @warning: commit needed
+        """
+        self.remove([filepath for filepath in self.get().keys()
+                     if not os.path.exists(filepath) and
+                     os.path.isdir(os.path.dirname(filepath))])
+
+    def dump(self):
+        """
+            Get a human readable report
+            @return str
+        """
+        lines = []
+        for (filepath, (mtime, size, reason, ctime)) in sorted(
+                                                    self.get().items()):
+            lines.append("%s: %s" % (filepath, reason))
+        lines.append("%s quarantined files" % len(lines))
+        return "\n".join(lines)
@@ -0,0 +1,140 @@
+# Copyright (c) 2014-2015 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import re
+import sqlite3
+
+from lollypop.sqlcursor import SqlCursor
+
+
+class QueryPlanReport:
+    """
+        Query plans of hot DAO lookups, with and without lookup indexes
+        Plans are computed on an empty in memory copy of db schema
+    """
+    # (DAO method, query)
+    QUERIES = [
+        ("TracksDatabase.get_id_by_path",
+         "SELECT rowid FROM tracks WHERE filepath=?"),
+        ("TracksDatabase.get_artist_ids",
+         "SELECT artist_id FROM track_artists WHERE track_id=?"),
+        ("TracksDatabase.get_genre_ids",
+         "SELECT genre_id FROM track_genres WHERE track_id=?"),
+        ("TracksDatabase.get_artist_names",
+         "SELECT name FROM artists, track_artists\
+          WHERE track_artists.track_id=?\
+          AND track_artists.artist_id=artists.rowid"),
+        ("TracksDatabase.get_stats",
+         "SELECT popularity, ltime FROM tracks\
+          WHERE basename=? AND duration=?"),
+        ("AlbumsDatabase.get_tracks",
+         "SELECT rowid FROM tracks WHERE album_id=?\
+          ORDER BY discnumber, tracknumber"),
+        ("AlbumsDatabase.get_tracks (genre)",
+         "SELECT tracks.rowid FROM tracks, track_genres\
+          WHERE album_id=? AND track_genres.track_id = tracks.rowid\
+          AND track_genres.genre_id=? ORDER BY discnumber, tracknumber"),
+        ("AlbumsDatabase.get_genre_ids",
+         "SELECT genre_id FROM album_genres WHERE album_id=?"),
+        ("AlbumsDatabase.get_ids (artist)",
+         "SELECT rowid FROM albums WHERE artist_id=?\
+          ORDER BY year, name COLLATE NOCASE"),
+        ("AlbumsDatabase.get_ids (genre)",
+         "SELECT albums.rowid FROM albums, album_genres, artists\
+          WHERE album_genres.genre_id=? AND artists.rowid=artist_id\
+          AND album_genres.album_id=albums.rowid\
+          ORDER BY artists.sortname COLLATE NOCASE, albums.year,\
+          albums.name COLLATE NOCASE"),
+        ("ArtistsDatabase.get_id",
+         "SELECT rowid from artists WHERE name=?"),
+        ("ArtistsDatabase.get_compilations",
+         "SELECT DISTINCT albums.rowid FROM albums, tracks, track_artists\
+          WHERE track_artists.artist_id=?\
+          AND track_artists.track_id=tracks.rowid\
+          AND albums.rowid=tracks.album_id AND albums.artist_id=?\
+          ORDER BY albums.year"),
+        ("GenresDatabase.get_id",
+         "SELECT rowid from genres WHERE name=?"),
+        ("GenresDatabase.get_albums",
+         "SELECT albums.rowid FROM albums, album_genres\
+          WHERE album_genres.genre_id=?\
+          AND album_genres.album_id=albums.rowid"),
+        ("GenresDatabase.clean",
+         "SELECT track_id from track_genres WHERE genre_id=? LIMIT 1")]
+
+    def __init__(self, db):
+        """
+            Init report
+            @param db as Database
+        """
+        self._db = db
+
+    def dump(self):
+        """
+            Get a human readable report, full table scans are marked
+            @return str
+        """
+        names = set()
+        for index in self._db.create_indexes:
+            names.add(re.search(r"INDEX (\w+)", index).group(1))
+        with SqlCursor(self._db) as sql:
+            result = sql.execute("SELECT type, name, sql FROM sqlite_master\
+                                  WHERE sql NOT NULL\
+                                  ORDER BY type='index'")
+            schema = list(result)
+        before = self._get_plans([statement for (kind, name, statement)
+                                  in schema if name not in names])
+        after = self._get_plans([statement for (kind, name, statement)
+                                 in schema])
+        lines = []
+        for (method, query) in self.QUERIES:
+            lines.append(method)
+            lines.append("  before: %s" % before[method])
+            lines.append("  after:  %s" % after[method])
+        return "\n".join(lines)
+
+#######################
+# PRIVATE             #
+#######################
+    def _get_plans(self, schema):
+        """
+            Get query plans for schema
+            @param schema as [str], sql statements
+            @return {method as str: plan as str}
+        """
+        plans = {}
+        db = sqlite3.connect(":memory:")
+        try:
+            for statement in schema:
+                try:
+                    db.execute(statement)
+                except sqlite3.OperationalError:
+                    # Shadow tables already created by their virtual table
+                    pass
+            for (method, query) in self.QUERIES:
+                try:
+                    result = db.execute("EXPLAIN QUERY PLAN " + query,
+                                        (0,) * query.count("?"))
+                    details = [row[-1] for row in result]
+                    plan = "; ".join(details)
+                    # Temp b-trees for ORDER BY are fine on small sets
+                    if any([detail.startswith("SCAN") and
+                            "COVERING INDEX" not in detail and
+                            " USING INDEX" not in detail
+                            for detail in details]):
+                        plan = "(!) " + plan
+                except Exception as e:
+                    plan = "%s" % e
+                plans[method] = plan
+        finally:
+            db.close()
+        return plans
@@ -0,0 +1,137 @@
+# Copyright (c) 2014-2015 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import re
+
+from lollypop.sqlcursor import SqlCursor
+from lollypop.define import Lp
+
+
+class SearchDatabase:
+    """
+        Full text index of artists, albums and tracks, kept in sync by
+        scanner, index rowid is item id * 4 + item kind
+        If sqlite has no FTS5 support, search falls back to LIKE queries
+    """
+    ARTIST = 1
+    ALBUM = 2
+    TRACK = 3
+    # Indexed columns: name, artist, album
+    _ITEMS = {
+        ARTIST: "SELECT artists.rowid*4+1, artists.name, '', ''\
+                 FROM artists WHERE %s",
+        ALBUM: "SELECT albums.rowid*4+2, albums.name,\
+                IFNULL(artists.name, ''), ''\
+                FROM albums LEFT JOIN artists\
+                ON artists.rowid=albums.artist_id WHERE %s",
+        TRACK: "SELECT tracks.rowid*4+3, tracks.name,\
+                IFNULL((SELECT group_concat(artists.name, ', ')\
+                        FROM track_artists, artists\
+                        WHERE track_artists.track_id=tracks.rowid\
+                        AND artists.rowid=track_artists.artist_id), ''),\
+                IFNULL(albums.name, '')\
+                FROM tracks LEFT JOIN albums\
+                ON albums.rowid=tracks.album_id WHERE %s"}
+    _TABLES = {ARTIST: 'artists', ALBUM: 'albums', TRACK: 'tracks'}
+
+    def __init__(self):
+        """
+            Init search database object
+        """
+        with SqlCursor(Lp().db) as sql:
+            result = sql.execute("SELECT 1 FROM sqlite_master\
+                                  WHERE name='search'")
+            self._available = result.fetchone() is not None
+
+    def populate(sql):
+        """
+            Index all items, on db creation or upgrade
+            @param sql as sqlite cursor
+            @warning: commit needed
+        """
+        for kind in [SearchDatabase.ARTIST, SearchDatabase.ALBUM,
+                     SearchDatabase.TRACK]:
+            sql.execute("INSERT INTO search (rowid, name, artist, album) " +
+                        SearchDatabase._ITEMS[kind] % "1")
+
+    def add(self, kind, ids):
+        """
+            Index items
+            @param kind as int
+            @param ids as [int]
+            @warning: commit needed
+        """
+        if not self._available or not ids:
+            return
+        with SqlCursor(Lp().db) as sql:
+            sql.executemany("INSERT OR REPLACE INTO search\
+                             (rowid, name, artist, album) " +
+                            self._ITEMS[kind] % (self._TABLES[kind] +
+                                                 ".rowid=?"),
+                            [(item_id,) for item_id in ids])
+
+    def remove(self, kind, ids):
+        """
+            Remove items no longer in db from index
+            @param kind as int
+            @param ids as [int]
+            @warning: commit needed
+        """
+        if not self._available or not ids:
+            return
+        with SqlCursor(Lp().db) as sql:
+            sql.executemany("DELETE FROM search WHERE rowid=?\
+                             AND NOT EXISTS (\
+                                SELECT 1 FROM %s WHERE rowid=?)" %
+                            self._TABLES[kind],
+                            [(item_id * 4 + kind, item_id)
+                             for item_id in ids])
+
+    def search(self, query, limit=25):
+        """
+            Search artists, albums and tracks with words starting
+            with each word of query
+            @param query as str
+            @param limit as int
+            @return [(kind as int, id as int)], best matches first
+        """
+        words = re.findall(r"\w+", query)
+        if not words:
+            return []
+        if not self._available:
+            return self._search_like(query, limit)
+        match = " ".join(['"%s"*' % word for word in words])
+        with SqlCursor(Lp().db) as sql:
+            # Lower bm25() is better, names weigh more than artists/albums
+            result = sql.execute("SELECT rowid FROM search\
+                                  WHERE search MATCH ?\
+                                  ORDER BY bm25(search, 10.0, 4.0, 2.0)\
+                                  LIMIT ?", (match, limit))
+            return [(rowid % 4, rowid // 4) for (rowid,) in result]
+
+#######################
+# PRIVATE             #
+#######################
+    def _search_like(self, query, limit):
+        """
+            Search without index
+            @param query as str
+            @param limit as int
+            @return [(kind as int, id as int)]
+        """
+        items = [(self.ARTIST, artist_id)
+                 for artist_id in Lp().artists.search(query)]
+        items += [(self.ALBUM, album_id)
+                  for (album_id, artist_id) in Lp().albums.search(query)]
+        items += [(self.TRACK, track_id)
+                  for (track_id, name) in Lp().tracks.search(query)]
+        return items[0:limit]
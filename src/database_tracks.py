@@ -10,10 +10,9 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-from gi.repository import GLib
-
 from gettext import gettext as _
 import itertools
+import os
 
 from lollypop.sqlcursor import SqlCursor
 from lollypop.define import Lp, Type
@@ -32,7 +31,7 @@ class TracksDatabase:
         pass
 
     def add(self, name, filepath, duration, tracknumber, discnumber,
-            album_id, year, popularity, ltime, mtime):
+            album_id, year, popularity, ltime, mtime, size=None, inode=None):
         """
             Add a new track to database
             @param name as string
@@ -46,23 +45,21 @@ class TracksDatabase:
             @param popularity as int
             @param ltime as int
             @param mtime as int
+            @param size as int
+            @param inode as int
             @return inserted rowid as int
             @warning: commit needed
         """
+        basename = os.path.basename(filepath)
         with SqlCursor(Lp().db) as sql:
             result = sql.execute(
                 "INSERT INTO tracks (name, filepath, duration, tracknumber,\
-                discnumber, album_id, year, popularity, ltime, mtime) VALUES\
-                (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (name,
-                                                  filepath,
-                                                  duration,
-                                                  tracknumber,
-                                                  discnumber,
-                                                  album_id,
-                                                  year,
-                                                  popularity,
-                                                  ltime,
-                                                  mtime))
+                discnumber, album_id, year, popularity, ltime, mtime,\
+                size, inode, basename) VALUES\
+                (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (name, filepath, duration, tracknumber, discnumber,
+                 album_id, year, popularity, ltime, mtime, size, inode,
+                 basename))
             return result.lastrowid
 
     def add_artist(self, track_id, artist_id):
@@ -73,11 +70,9 @@ class TracksDatabase:
             @warning: commit needed
         """
         with SqlCursor(Lp().db) as sql:
-            artists = self.get_artist_ids(track_id)
-            if artist_id not in artists:
-                sql.execute("INSERT INTO "
-                            "track_artists (track_id, artist_id)"
-                            "VALUES (?, ?)", (track_id, artist_id))
+            sql.execute("INSERT OR IGNORE INTO "
+                        "track_artists (track_id, artist_id)"
+                        "VALUES (?, ?)", (track_id, artist_id))
 
     def add_genre(self, track_id, genre_id):
         """
@@ -87,11 +82,9 @@ class TracksDatabase:
             @warning: commit needed
         """
         with SqlCursor(Lp().db) as sql:
-            genres = self.get_genre_ids(track_id)
-            if genre_id not in genres:
-                sql.execute("INSERT INTO "
-                            "track_genres (track_id, genre_id)"
-                            "VALUES (?, ?)", (track_id, genre_id))
+            sql.execute("INSERT OR IGNORE INTO "
+                        "track_genres (track_id, genre_id)"
+                        "VALUES (?, ?)", (track_id, genre_id))
 
     def get_ids(self):
         """
@@ -292,6 +285,130 @@ class TracksDatabase:
                 mtimes.update((row,))
             return mtimes
 
+    def get_fingerprints(self):
+        """
+            Get fingerprint for tracks
+            @return dict of {filepath as string:
+                             (track id as int, mtime as int,
+                              size as int/None, inode as int/None)}
+        """
+        with SqlCursor(Lp().db) as sql:
+            result = sql.execute("SELECT filepath, rowid, mtime, size, inode\
+                                  FROM tracks")
+            return {row[0]: row[1:] for row in result}
+
+    def get_rows(self, track_ids):
+        """
+            Get tracks fields, see Track.from_row()
+            @param track_ids as [int]
+            @return [(track id as int, name as str, album id as int,
+                      album artist id as int, album artist as str,
+                      album name as str, artist ids as [int],
+                      artist names as str, genre names as str,
+                      duration as int, tracknumber as int, path as str,
+                      album year as str)], in track_ids order
+        """
+        rows = {}
+        with SqlCursor(Lp().db) as sql:
+            # Stay under SQLITE_MAX_VARIABLE_NUMBER
+            for i in range(0, len(track_ids), 500):
+                chunk = track_ids[i:i + 500]
+                result = sql.execute("SELECT tracks.rowid, tracks.name,\
+                                      tracks.album_id, albums.artist_id,\
+                                      album_artists.name, albums.name,\
+                                      (SELECT group_concat(artist_id)\
+                                       FROM track_artists\
+                                       WHERE track_id=tracks.rowid),\
+                                      (SELECT group_concat(artists.name, ', ')\
+                                       FROM track_artists, artists\
+                                       WHERE track_id=tracks.rowid\
+                                       AND artists.rowid=artist_id),\
+                                      (SELECT group_concat(genres.name, ', ')\
+                                       FROM track_genres, genres\
+                                       WHERE track_id=tracks.rowid\
+                                       AND genres.rowid=genre_id),\
+                                      tracks.duration, tracks.tracknumber,\
+                                      tracks.filepath, albums.year\
+                                      FROM tracks LEFT JOIN albums\
+                                      ON albums.rowid=tracks.album_id\
+                                      LEFT JOIN artists AS album_artists\
+                                      ON album_artists.rowid=albums.artist_id\
+                                      WHERE tracks.rowid IN (%s)" %
+                                     ", ".join(["?"] * len(chunk)), chunk)
+                for (track_id, name, album_id, album_artist_id, album_artist,
+                     album_name, artist_ids, artist_names, genre_names,
+                     duration, tracknumber, path, year) in result:
+                    if album_artist_id is None:
+                        album_artist_id = Type.COMPILATIONS
+                    if album_artist is None:
+                        if album_artist_id == Type.COMPILATIONS:
+                            album_artist = _("Many artists")
+                        else:
+                            album_artist = _("Unknown")
+                    if album_name is None:
+                        album_name = _("Unknown")
+                    if artist_ids:
+                        artist_ids = [int(artist_id) for artist_id
+                                      in str(artist_ids).split(",")]
+                    else:
+                        artist_ids = []
+                    rows[track_id] = (track_id, name, album_id,
+                                      album_artist_id, album_artist,
+                                      album_name, artist_ids,
+                                      artist_names or "", genre_names or "",
+                                      duration, tracknumber, path,
+                                      str(year) if year else "")
+        return [rows[track_id] for track_id in track_ids
+                if track_id in rows]
+
+    def get_move_infos(self, track_ids):
+        """
+            Get infos needed to match tracks with moved files
+            @param track_ids as [int]
+            @return [(track id as int, name as str, album name as str,
+                      duration as int, tracknumber as int, size as int,
+                      popularity as int, ltime as int)]
+        """
+        infos = []
+        with SqlCursor(Lp().db) as sql:
+            # Stay under SQLITE_MAX_VARIABLE_NUMBER
+            for i in range(0, len(track_ids), 500):
+                chunk = track_ids[i:i + 500]
+                result = sql.execute("SELECT tracks.rowid, tracks.name,\
+                                      albums.name, tracks.duration,\
+                                      tracks.tracknumber, tracks.size,\
+                                      tracks.popularity, tracks.ltime\
+                                      FROM tracks, albums\
+                                      WHERE albums.rowid=tracks.album_id\
+                                      AND tracks.rowid IN (%s)" %
+                                     ", ".join(["?"] * len(chunk)), chunk)
+                infos += list(result)
+        return infos
+
+    def set_fingerprint(self, track_id, size, inode):
+        """
+            Set size and inode for track
+            @param track id as int
+            @param size as int
+            @param inode as int
+            @warning: commit needed
+        """
+        with SqlCursor(Lp().db) as sql:
+            sql.execute("UPDATE tracks SET size=?, inode=? WHERE rowid=?",
+                        (size, inode, track_id))
+
+    def set_path(self, track_id, filepath):
+        """
+            Set track path
+            @param track id as int
+            @param filepath as str
+            @warning: commit needed
+        """
+        with SqlCursor(Lp().db) as sql:
+            sql.execute("UPDATE tracks SET filepath=?, basename=?\
+                         WHERE rowid=?",
+                        (filepath, os.path.basename(filepath), track_id))
+
     def get_infos(self, track_id):
         """
             Get all track informations for track id
@@ -579,12 +696,11 @@ class TracksDatabase:
             @return (popularity, mtime) as (int, int)
         """
         with SqlCursor(Lp().db) as sql:
-            name = GLib.path_get_basename(path)
             result = sql.execute("SELECT popularity, ltime\
                                   FROM tracks\
-                                  WHERE filepath LIKE ?\
+                                  WHERE basename=?\
                                   AND duration=?",
-                                 ('%' + name + '%', duration))
+                                 (os.path.basename(path), duration))
             v = result.fetchone()
             if v is not None:
                 return v
@@ -610,6 +726,45 @@ class TracksDatabase:
                 return track_id
         return None
 
+    def remove_many(self, track_ids):
+        """
+            Remove tracks with a few set based statements
+            @param track_ids as [int]
+            @return ({album id as int: (count delta as int,
+                                        duration delta as int)},
+                     [artist ids as int], [genre ids as int])
+            @warning commit needed
+        """
+        with SqlCursor(Lp().db) as sql:
+            sql.execute("CREATE TEMP TABLE IF NOT EXISTS removed_tracks (\
+                            track_id INTEGER PRIMARY KEY)")
+            sql.execute("DELETE FROM removed_tracks")
+            sql.executemany("INSERT OR IGNORE INTO removed_tracks\
+                             (track_id) VALUES (?)",
+                            [(track_id,) for track_id in track_ids])
+            result = sql.execute("SELECT album_id, COUNT(1), SUM(duration)\
+                                  FROM tracks WHERE rowid IN (\
+                                    SELECT track_id FROM removed_tracks)\
+                                  GROUP BY album_id")
+            deltas = {album_id: (-count, -(duration or 0))
+                      for (album_id, count, duration) in result}
+            result = sql.execute("SELECT DISTINCT artist_id\
+                                  FROM track_artists WHERE track_id IN (\
+                                    SELECT track_id FROM removed_tracks)")
+            artist_ids = [row[0] for row in result]
+            result = sql.execute("SELECT DISTINCT genre_id\
+                                  FROM track_genres WHERE track_id IN (\
+                                    SELECT track_id FROM removed_tracks)")
+            genre_ids = [row[0] for row in result]
+            sql.execute("DELETE FROM track_genres WHERE track_id IN (\
+                            SELECT track_id FROM removed_tracks)")
+            sql.execute("DELETE FROM track_artists WHERE track_id IN (\
+                            SELECT track_id FROM removed_tracks)")
+            sql.execute("DELETE FROM tracks WHERE rowid IN (\
+                            SELECT track_id FROM removed_tracks)")
+            sql.execute("DELETE FROM removed_tracks")
+            return (deltas, artist_ids, genre_ids)
+
     def remove(self, track_id):
         """
             Remove track
@@ -10,7 +10,10 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
+import os
+
 from lollypop.sqlcursor import SqlCursor
+from lollypop.database_search import SearchDatabase
 from lollypop.utils import translate_artist_name
 
 
@@ -32,7 +35,17 @@ class DatabaseUpgrade:
         self._UPGRADES = {
             1: "UPDATE tracks SET duration=CAST(duration as INTEGER);",
             2: "UPDATE albums SET artist_id=-2001 where artist_id=-999;",
-            3: self._upgrade_3
+            3: self._upgrade_3,
+            4: self._upgrade_4,
+            5: "CREATE TABLE directories (path TEXT NOT NULL UNIQUE,\
+                                          mtime INT NOT NULL,\
+                                          count INT NOT NULL)",
+            6: self._upgrade_6,
+            7: self._upgrade_7,
+            8: self._upgrade_8,
+            9: self._upgrade_9,
+            10: self._upgrade_10,
+            11: self._upgrade_11
                          }
 
     """
@@ -78,3 +91,93 @@ class DatabaseUpgrade:
                 sql.execute("UPDATE artists SET sortname=? WHERE rowid=?",
                             (row[1], row[0]))
             sql.commit()
+
+    def _upgrade_4(self):
+        """
+            Add size and inode fields to tracks, used by scanner
+            to detect changes and moves
+        """
+        with SqlCursor(self._db) as sql:
+            sql.execute("ALTER TABLE tracks ADD size INT")
+            sql.execute("ALTER TABLE tracks ADD inode INT")
+            sql.commit()
+
+    def _upgrade_6(self):
+        """
+            Add an indexed basename field to tracks, used by scanner
+            to restore stats of moved files
+        """
+        with SqlCursor(self._db) as sql:
+            sql.execute("ALTER TABLE tracks ADD basename TEXT")
+            result = sql.execute("SELECT rowid, filepath FROM tracks")
+            sql.executemany("UPDATE tracks SET basename=? WHERE rowid=?",
+                            [(os.path.basename(filepath), track_id)
+                             for (track_id, filepath) in result.fetchall()])
+            sql.execute("CREATE INDEX idx_tracks_basename\
+                         ON tracks(basename, duration)")
+            sql.commit()
+
+    def _upgrade_7(self):
+        """
+            Add album signatures, used by scanner to restore album stats
+        """
+        with SqlCursor(self._db) as sql:
+            sql.execute(self._db.create_album_signatures)
+            result = sql.execute("SELECT rowid, name FROM albums")
+            names = dict(result.fetchall())
+            result = sql.execute("SELECT album_id, COUNT(1), SUM(duration)\
+                                  FROM tracks GROUP BY album_id")
+            sql.executemany("INSERT INTO album_signatures\
+                             (album_id, name, count, duration)\
+                             VALUES (?, ?, ?, ?)",
+                            [(album_id, names[album_id].strip().lower(),
+                              count, duration or 0)
+                             for (album_id, count, duration)
+                             in result.fetchall() if album_id in names])
+            sql.execute(self._db.create_album_signatures_index)
+            sql.commit()
+
+    def _upgrade_8(self):
+        """
+            Add scan checkpoint tables
+        """
+        with SqlCursor(self._db) as sql:
+            sql.execute(self._db.create_scan_checkpoint)
+            sql.execute(self._db.create_scan_done)
+            sql.commit()
+
+    def _upgrade_9(self):
+        """
+            Add scanner quarantine table
+        """
+        with SqlCursor(self._db) as sql:
+            sql.execute(self._db.create_quarantine)
+            sql.commit()
+
+    def _upgrade_10(self):
+        """
+            Remove duplicated junction rows, then add lookup indexes
+        """
+        with SqlCursor(self._db) as sql:
+            for (table, columns) in [("track_artists", "track_id, artist_id"),
+                                     ("track_genres", "track_id, genre_id"),
+                                     ("album_genres", "album_id, genre_id")]:
+                sql.execute("DELETE FROM %s WHERE rowid NOT IN (\
+                                SELECT MIN(rowid) FROM %s\
+                                GROUP BY %s)" % (table, table, columns))
+            for index in self._db.create_indexes:
+                sql.execute(index)
+            sql.commit()
+
+    def _upgrade_11(self):
+        """
+            Add full text index
+        """
+        with SqlCursor(self._db) as sql:
+            try:
+                sql.execute(self._db.create_search)
+                SearchDatabase.populate(sql)
+            except Exception as e:
+                # No FTS5 support, search uses LIKE queries
+                print("DatabaseUpgrade::_upgrade_11(): %s" % e)
+            sql.commit()
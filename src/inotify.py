@@ -13,79 +13,219 @@
 from gi.repository import Gio, GLib
 
 import os
+from threading import Thread
+from time import time
 
 from lollypop.define import Lp
-from lollypop.utils import is_audio
+from lollypop.utils import debug
 
 
 class Inotify:
     """
-        Inotify support
+        Inotify support, with a watch budget:
+            - hot directories get a file monitor
+            - cold directories are polled for mtime changes
+        A changed cold directory becomes hot, least recently
+        changed hot directory becoming cold
     """
     # 10 second before updating database
     _TIMEOUT = 10000
+    # Cold directories polling interval
+    _POLL_INTERVAL = 60000
+    _MAX_USER_WATCHES = "/proc/sys/fs/inotify/max_user_watches"
 
     def __init__(self):
         """
             Init inode notification
         """
         self._monitors = {}
+        # Cold directories as {path: mtime}
+        self._cold = {}
+        # Last change time for hot directories
+        self._activity = {}
+        # Paths changed since last update
+        self._changes = set()
         self._timeout = None
+        self._polling = False
+        self._budget = self._get_budget()
+        GLib.timeout_add(self._POLL_INTERVAL, self._poll)
 
     def add_monitor(self, path):
         """
-            Add a monitor for path
+            Add a monitor for path, poll it if watch budget is exhausted
             @param path as string
         """
         # Check if there is already a monitor for this path
-        if path in self._monitors.keys():
+        if path in self._monitors.keys() or path in self._cold.keys():
+            return
+        if len(self._monitors) < self._budget and self._watch(path):
             return
         try:
-            f = Gio.File.new_for_path(path)
-            monitor = f.monitor_directory(Gio.FileMonitorFlags.NONE,
-                                          None)
-            if monitor is not None:
-                monitor.connect('changed', self._on_dir_changed)
-                self._monitors[path] = monitor
+            self._cold[path] = os.stat(path).st_mtime_ns
         except:
             pass
 
+    def remove_monitor(self, path):
+        """
+            Remove monitors for path and its subdirectories
+            @param path as string
+        """
+        # Files and unwatched directories, don't scan all watches
+        if path not in self._monitors.keys() and\
+                path not in self._cold.keys():
+            return
+        prefix = path + "/"
+        for monitored in [p for p in self._monitors.keys()
+                          if p == path or p.startswith(prefix)]:
+            self._monitors.pop(monitored).cancel()
+            self._activity.pop(monitored, None)
+        for polled in [p for p in self._cold.keys()
+                       if p == path or p.startswith(prefix)]:
+            del self._cold[polled]
+
+    def get_usage(self):
+        """
+            Get watch usage
+            @return str
+        """
+        return "%s directories watched, %s polled, budget %s" % (
+                                                        len(self._monitors),
+                                                        len(self._cold),
+                                                        self._budget)
+
 #######################
 # PRIVATE             #
 #######################
-    def _on_dir_changed(self, monitor, changed_file, other_file, event):
-        """
-            Prepare thread to handle changes
-        """
-        # Stop collection scanner and wait
-        if Lp().scanner.is_locked():
-            Lp().scanner.stop()
-            GLib.timeout_add(1000,
-                             self._on_dir_changed,
-                             monitor,
-                             changed_file,
-                             other_file,
-                             event)
-        # Run update delayed
-        else:
-            path = changed_file.get_path()
-            # If a directory, monitor it
-            if os.path.exists(path) and\
-               changed_file.query_file_type(Gio.FileQueryInfoFlags.NONE,
-                                            None) == Gio.FileType.DIRECTORY:
-                self.add_monitor(path)
-            # If not an audio file, exit
-            elif not is_audio(changed_file):
-                return
-            if self._timeout is not None:
-                GLib.source_remove(self._timeout)
-                self._timeout = None
-            self._timeout = GLib.timeout_add(self._TIMEOUT,
-                                             self._run_collection_update)
+    def _get_budget(self):
+        """
+            Get max watched directories
+            @return int
+        """
+        budget = Lp().settings.get_value('inotify-watches').get_int32()
+        if budget > 0:
+            return budget
+        # Let some watches to other applications
+        try:
+            with open(self._MAX_USER_WATCHES) as f:
+                return int(f.read()) // 2
+        except:
+            return 4096
+
+    def _watch(self, path):
+        """
+            Monitor path
+            @param path as string
+            @return True if monitored
+        """
+        try:
+            f = Gio.File.new_for_path(path)
+            monitor = f.monitor_directory(Gio.FileMonitorFlags.NONE,
+                                          None)
+            if monitor is not None:
+                monitor.connect('changed', self._on_dir_changed, path)
+                self._monitors[path] = monitor
+                self._activity[path] = 0
+                return True
+        except Exception as e:
+            print("Inotify::_watch(): %s" % e)
+        return False
+
+    def _promote(self, path):
+        """
+            Make a cold directory hot
+            @param path as string
+        """
+        if len(self._monitors) >= self._budget and self._activity:
+            coldest = min(self._activity.keys(),
+                          key=lambda p: self._activity[p])
+            self._monitors.pop(coldest).cancel()
+            del self._activity[coldest]
+            try:
+                self._cold[coldest] = os.stat(coldest).st_mtime_ns
+            except:
+                pass
+        if self._watch(path):
+            self._activity[path] = time()
+            self._cold.pop(path, None)
+
+    def _poll(self):
+        """
+            Check cold directories mtime in a thread
+        """
+        if self._cold and not self._polling:
+            self._polling = True
+            thread = Thread(target=self._check_cold, args=(dict(self._cold),))
+            thread.daemon = True
+            thread.start()
+        return True
+
+    def _check_cold(self, cold):
+        """
+            Compare cold directories mtime
+            @param cold as {path as str: mtime as int}
+            @thread safe
+        """
+        changed = []
+        removed = []
+        for (path, mtime) in cold.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    changed.append(path)
+            except:
+                removed.append(path)
+        GLib.idle_add(self._on_polled, changed, removed)
+
+    def _queue_update(self, path):
+        """
+            Remember changed path and delay update
+            @param path as string
+        """
+        self._changes.add(path)
+        if self._timeout is not None:
+            GLib.source_remove(self._timeout)
+        self._timeout = GLib.timeout_add(self._TIMEOUT,
+                                         self._run_collection_update)
+
+    def _on_polled(self, changed, removed):
+        """
+            Handle cold directories changes
+            @param changed as [str]
+            @param removed as [str]
+        """
+        self._polling = False
+        for path in removed:
+            self.remove_monitor(path)
+            self._queue_update(path)
+        for path in changed:
+            if path in self._cold.keys():
+                self._promote(path)
+                self._queue_update(path)
+        if changed or removed:
+            debug("Inotify::_on_polled(): %s" % self.get_usage())
+
+    def _on_dir_changed(self, monitor, changed_file, other_file, event,
+                        watched):
+        """
+            Remember changed path and delay update
+            @param watched as string, monitored directory
+        """
+        path = changed_file.get_path()
+        self._activity[watched] = time()
+        if event == Gio.FileMonitorEvent.DELETED:
+            self.remove_monitor(path)
+        # If a directory, monitor it
+        elif os.path.exists(path) and\
+            changed_file.query_file_type(Gio.FileQueryInfoFlags.NONE,
+                                         None) == Gio.FileType.DIRECTORY:
+            self.add_monitor(path)
+        self._queue_update(path)
 
     def _run_collection_update(self):
         """
-            Run a collection update
+            Update changed paths, wait for running scan to finish
         """
-        self._timeout = None
-        Lp().window.update_db()
+        if Lp().scanner.update_paths(list(self._changes)):
+            self._changes = set()
+            self._timeout = None
+            return False
+        return True
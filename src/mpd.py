@@ -1115,7 +1115,7 @@ class MpdHandler(socketserver.StreamRequestHandler):
             @param args as str
             @return msg as str
         """
-        Lp().window.update_db()
+        Lp().window.update_db(True)
         return ""
 
     def _urlhandlers(self, cmd_args):
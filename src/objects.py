@@ -118,7 +118,7 @@ class Disc:
 
             @return list of Track
         """
-        return [Track(id) for id in self.tracks_ids]
+        return Track.from_ids(self.tracks_ids)
 
 
 class Album(Base):
@@ -138,6 +138,35 @@ class Album(Base):
         self.id = album_id
         self.genre_id = genre_id
 
+    def from_row(row, genre_id=None):
+        """
+            Get album with fields already loaded, path stays lazy
+            as AlbumsDatabase.get_path() repairs moved albums
+            @param row as tuple, see AlbumsDatabase.get_rows()
+            @param genre_id as int
+            @return Album
+        """
+        (album_id, name, artist_id, artist_name, year) = row
+        album = Album(album_id, genre_id)
+        album._name = name
+        album._artist_id = artist_id
+        album._artist_name = artist_name
+        album._year = year
+        return album
+
+    def from_ids(album_ids, genre_id=None):
+        """
+            Get albums with fields loaded in one query
+            Ids missing in db give an album loading its fields lazily
+            @param album_ids as [int]
+            @param genre_id as int
+            @return [Album], in album_ids order
+        """
+        rows = {row[0]: row for row in Lp().albums.get_rows(album_ids)}
+        return [Album.from_row(rows[album_id], genre_id)
+                if album_id in rows else Album(album_id, genre_id)
+                for album_id in album_ids]
+
     def set_genre(self, genre_id):
         """
             Change current genre to lookup
@@ -176,7 +205,7 @@ class Album(Base):
             @return list of Track
         """
         if not self._tracks and self.tracks_ids:
-            self._tracks = [Track(track_id) for track_id in self.tracks_ids]
+            self._tracks = Track.from_ids(self.tracks_ids)
         return self._tracks
 
     @property
@@ -208,6 +237,43 @@ class Track(Base):
         self.id = track_id
         self._uri = None
 
+    def from_row(row):
+        """
+            Get track with fields already loaded
+            @param row as tuple, see TracksDatabase.get_rows()
+            @return Track
+        """
+        (track_id, name, album_id, album_artist_id, album_artist,
+         album_name, artist_ids, artist_names, genre_names,
+         duration, tracknumber, path, year) = row
+        track = Track(track_id)
+        track._name = name
+        track._album_id = album_id
+        track._album_artist_id = album_artist_id
+        track._album_artist = album_artist
+        track._album_name = album_name
+        track._artist_ids = artist_ids
+        track._artist_names = artist_names
+        track._genre_names = genre_names
+        track._duration = duration
+        track._number = tracknumber
+        track._position = tracknumber or 0
+        track._path = path
+        track._year = year
+        return track
+
+    def from_ids(track_ids):
+        """
+            Get tracks with fields loaded in one query
+            Ids missing in db give a track loading its fields lazily
+            @param track_ids as [int]
+            @return [Track], in track_ids order
+        """
+        rows = {row[0]: row for row in Lp().tracks.get_rows(track_ids)}
+        return [Track.from_row(rows[track_id])
+                if track_id in rows else Track(track_id)
+                for track_id in track_ids]
+
     @property
     def title(self):
         """
@@ -252,7 +318,9 @@ class Track(Base):
             Get track year
             @return str
         """
-        return self.album.year
+        if getattr(self, "_year") is None:
+            self._year = self.album.year
+        return self._year
 
     @property
     def album_artist(self):
@@ -25,6 +25,7 @@ class BasePlayer(GObject.GObject):
         'next-changed': (GObject.SignalFlags.RUN_FIRST, None, ()),
         'seeked': (GObject.SignalFlags.RUN_FIRST, None, (int,)),
         'status-changed': (GObject.SignalFlags.RUN_FIRST, None, ()),
+        'buffering-changed': (GObject.SignalFlags.RUN_FIRST, None, (int,)),
         'volume-changed': (GObject.SignalFlags.RUN_FIRST, None, ()),
         'queue-changed': (GObject.SignalFlags.RUN_FIRST, None, ()),
         'party-changed': (GObject.SignalFlags.RUN_FIRST, None, (bool,))
@@ -52,6 +52,7 @@ class BinPlayer(ReplayGainPlayer, BasePlayer):
         bus.connect('message::element', self._on_bus_element)
         bus.connect('message::stream-start', self._on_stream_start)
         bus.connect("message::tag", self._on_bus_message_tag)
+        bus.connect('message::buffering', self._on_bus_buffering)
         self._handled_error = None
         self._start_time = 0
 
@@ -265,6 +266,14 @@ class BinPlayer(ReplayGainPlayer, BasePlayer):
             if self._codecs is not None:
                 self._codecs.append(message)
 
+    def _on_bus_buffering(self, bus, message):
+        """
+            Notify buffer level
+            @param bus as Gst.Bus
+            @param message as Gst.Message
+        """
+        self.emit('buffering-changed', message.parse_buffering())
+
     def _on_bus_error(self, bus, message):
         """
             Handle first bus error, ignore others
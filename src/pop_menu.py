@@ -425,7 +425,7 @@ class EditMenu(BaseMenu):
             @param status as int
         """
         if status == 0:
-            Lp().window.update_db()
+            Lp().window.update_db(True)
 
 
 class AlbumMenu(Gio.Menu):
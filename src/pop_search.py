@@ -16,6 +16,7 @@ from cgi import escape
 from threading import Thread
 
 from lollypop.define import Lp, ArtSize, Type
+from lollypop.database_search import SearchDatabase
 from lollypop.objects import Track, Album
 from lollypop.pop_menu import TrackMenuPopover, TrackMenu
 from lollypop.widgets_album_context import AlbumPopoverWidget
@@ -216,19 +217,21 @@ class SearchPopover(Gtk.Popover):
         """
         results = []
         albums = []
+        tracks = []
 
-        tracks_non_album_artist = []
-
-        # Get all albums for all artists and non album_artist tracks
-        for artist_id in Lp().artists.search(self._current_search):
-            for album_id in Lp().albums.get_ids(artist_id, None):
-                if (album_id, artist_id) not in albums:
-                    albums.append((album_id, artist_id))
-            for track_id, track_name in Lp().tracks.get_as_non_album_artist(
-                                                        artist_id):
-                tracks_non_album_artist.append((track_id, track_name))
-
-        albums += Lp().albums.search(self._current_search)
+        # Artists hits bring their albums and non album_artist tracks
+        for (kind, item_id) in Lp().search.search(self._current_search, 50):
+            if kind == SearchDatabase.ARTIST:
+                for album_id in Lp().albums.get_ids(item_id, None):
+                    if (album_id, item_id) not in albums:
+                        albums.append((album_id, item_id))
+                tracks += Lp().tracks.get_as_non_album_artist(item_id)
+            elif kind == SearchDatabase.ALBUM:
+                artist_id = Lp().albums.get_artist_id(item_id)
+                if (item_id, artist_id) not in albums:
+                    albums.append((item_id, artist_id))
+            else:
+                tracks.append((item_id, Lp().tracks.get_name(item_id)))
 
         for album_id, artist_id in albums:
             search_obj = SearchObject()
@@ -239,8 +242,7 @@ class SearchPopover(Gtk.Popover):
             search_obj.album_id = album_id
             results.append(search_obj)
 
-        for track_id, track_name in Lp().tracks.search(
-                        self._current_search) + tracks_non_album_artist:
+        for track_id, track_name in tracks:
             search_obj = SearchObject()
             search_obj.title = track_name
             search_obj.id = track_id
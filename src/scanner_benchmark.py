@@ -0,0 +1,343 @@
+# Copyright (c) 2014-2015 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from gi.repository import Gio, GLib, Gst
+
+import os
+import shutil
+import struct
+import tempfile
+from time import time
+
+from lollypop.collectionscanner import CollectionScanner
+from lollypop.database import Database
+from lollypop.database_albums import AlbumsDatabase
+from lollypop.database_artists import ArtistsDatabase
+from lollypop.database_checkpoint import CheckpointDatabase
+from lollypop.database_directories import DirectoriesDatabase
+from lollypop.database_genres import GenresDatabase
+from lollypop.database_quarantine import QuarantineDatabase
+from lollypop.database_search import SearchDatabase
+from lollypop.database_tracks import TracksDatabase
+from lollypop.scanner_progress import ScanProgress
+from lollypop.settings import Settings
+from lollypop.sqlcursor import SqlCursor
+from lollypop.tagcache import TagCache
+
+
+class LibraryGenerator:
+    """
+        Write a synthetic library of tagged FLAC files
+        Files only contain metadata blocks: enough for tag readers,
+        not for playback
+    """
+    _GENRES = ['Rock', 'Jazz', 'Electronic', 'Classical', 'Folk']
+    _RATE = 44100
+
+    def __init__(self, path):
+        """
+            Init generator
+            @param path as str, library root
+        """
+        self._path = path
+        # {filepath as str: (tags as {str: str}, duration as int)}
+        self._files = {}
+
+    def generate(self, artists, albums, tracks):
+        """
+            Write library
+            @param artists as int
+            @param albums as int, per artist
+            @param tracks as int, per album
+            @return files written as int
+        """
+        for i in range(0, artists):
+            artist = "Artist %s" % i
+            genre = self._GENRES[i % len(self._GENRES)]
+            for j in range(0, albums):
+                self.add_album(artist, "%s Album %s" % (artist, j),
+                               genre, tracks)
+        return len(self._files)
+
+    def add_album(self, artist, album, genre, tracks):
+        """
+            Write an album
+            @param artist as str
+            @param album as str
+            @param genre as str
+            @param tracks as int
+            @return [str]
+        """
+        path = os.path.join(self._path, artist, album)
+        os.makedirs(path, exist_ok=True)
+        filepaths = []
+        for tracknumber in range(1, tracks + 1):
+            filepath = os.path.join(path, "%02d - Track %s.flac" %
+                                    (tracknumber, tracknumber))
+            tags = {'TITLE': "Track %s" % tracknumber,
+                    'ARTIST': artist,
+                    'ALBUM': album,
+                    'GENRE': genre,
+                    'TRACKNUMBER': "%s" % tracknumber,
+                    'DATE': "%s" % (1970 + len(album) % 50)}
+            self._write(filepath, tags, 120 + tracknumber * 7)
+            filepaths.append(filepath)
+        return filepaths
+
+    def get_files(self):
+        """
+            Get written files
+            @return [str], sorted
+        """
+        return sorted(self._files.keys())
+
+    def retag(self, filepaths):
+        """
+            Change title of files in place, mtime is moved forward,
+            directory mtime is unchanged
+            @param filepaths as [str]
+        """
+        for filepath in filepaths:
+            (tags, duration) = self._files[filepath]
+            tags['TITLE'] += " (edit)"
+            mtime = os.stat(filepath).st_mtime
+            self._write(filepath, tags, duration)
+            os.utime(filepath, (mtime + 1, mtime + 1))
+
+    def remove(self, filepaths):
+        """
+            Delete files
+            @param filepaths as [str]
+        """
+        for filepath in filepaths:
+            os.remove(filepath)
+            del self._files[filepath]
+
+    def remove_artists(self, count):
+        """
+            Delete directories of first artists
+            @param count as int
+            @return files deleted as int
+        """
+        names = sorted(os.listdir(self._path))[0:count]
+        prefixes = tuple([os.path.join(self._path, name) + "/"
+                          for name in names])
+        for name in names:
+            shutil.rmtree(os.path.join(self._path, name))
+        filepaths = [filepath for filepath in self._files.keys()
+                     if filepath.startswith(prefixes)]
+        for filepath in filepaths:
+            del self._files[filepath]
+        return len(filepaths)
+
+#######################
+# PRIVATE             #
+#######################
+    def _write(self, filepath, tags, duration):
+        """
+            Write a FLAC file with STREAMINFO and VORBIS_COMMENT blocks
+            @param filepath as str
+            @param tags as {str: str}
+            @param duration as int, seconds
+        """
+        # Rate: 20 bits, channels - 1: 3 bits, bits per sample - 1: 5 bits,
+        # samples: 36 bits
+        fields = (self._RATE << 44) | (1 << 41) | (15 << 36) |\
+            (duration * self._RATE)
+        streaminfo = struct.pack(">HH", 4096, 4096) + bytes(6) +\
+            fields.to_bytes(8, 'big') + bytes(16)
+        vendor = b"lollypop"
+        comment = struct.pack("<I", len(vendor)) + vendor +\
+            struct.pack("<I", len(tags))
+        for (key, value) in tags.items():
+            data = ("%s=%s" % (key, value)).encode('utf-8')
+            comment += struct.pack("<I", len(data)) + data
+        with open(filepath, 'wb') as f:
+            f.write(b"fLaC")
+            f.write(bytes([0]) + len(streaminfo).to_bytes(3, 'big'))
+            f.write(streaminfo)
+            f.write(bytes([0x84]) + len(comment).to_bytes(3, 'big'))
+            f.write(comment)
+        self._files[filepath] = (tags, duration)
+
+
+class ScannerBenchmark(Gio.Application):
+    """
+        Run collection scanner on a synthetic library, without window:
+            lollypop --benchmark [--artists n] [--albums n] [--tracks n]
+        Db, tag cache and settings are throwaway, user data is untouched
+    """
+
+    def __init__(self):
+        """
+            Init benchmark application
+        """
+        Gio.Application.__init__(
+                        self,
+                        application_id='org.gnome.Lollypop.Benchmark',
+                        flags=Gio.ApplicationFlags.HANDLES_COMMAND_LINE |
+                        Gio.ApplicationFlags.NON_UNIQUE)
+        # Attributes scanner expects on Lp()
+        self.debug = False
+        self.notify = None
+        self.player = None
+        self.add_main_option("benchmark", b'\0', GLib.OptionFlags.NONE,
+                             GLib.OptionArg.NONE,
+                             "Benchmark collection scanner", None)
+        self.add_main_option("artists", b'\0', GLib.OptionFlags.NONE,
+                             GLib.OptionArg.INT,
+                             "Artists in library (default: 20)", None)
+        self.add_main_option("albums", b'\0', GLib.OptionFlags.NONE,
+                             GLib.OptionArg.INT,
+                             "Albums per artist (default: 5)", None)
+        self.add_main_option("tracks", b'\0', GLib.OptionFlags.NONE,
+                             GLib.OptionArg.INT,
+                             "Tracks per album (default: 10)", None)
+        self.add_main_option("debug", b'd', GLib.OptionFlags.NONE,
+                             GLib.OptionArg.NONE, "Debug lollypop", None)
+        self.connect('command-line', self._on_command_line)
+
+#######################
+# PRIVATE             #
+#######################
+    def _on_command_line(self, app, app_cmd_line):
+        """
+            Run benchmark
+            @param app as Gio.Application
+            @param options as Gio.ApplicationCommandLine
+            @return exit status as int
+        """
+        options = app_cmd_line.get_options_dict()
+        self.debug = options.contains('debug')
+        counts = []
+        for (name, default) in [('artists', 20), ('albums', 5),
+                                ('tracks', 10)]:
+            value = options.lookup_value(name)
+            counts.append(default if value is None else value.get_int32())
+        path = tempfile.mkdtemp(prefix="lollypop-benchmark-")
+        try:
+            self._run(path, *counts)
+        except Exception as e:
+            print("ScannerBenchmark::_on_command_line(): %s" % e)
+            return 1
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+        return 0
+
+    def _run(self, path, artists, albums, tracks):
+        """
+            Generate library and run scanner cases
+            @param path as str, throwaway directory
+            @param artists as int
+            @param albums as int
+            @param tracks as int
+        """
+        library = os.path.join(path, "music")
+        os.mkdir(library)
+        Database.LOCAL_PATH = path
+        Database.DB_PATH = os.path.join(path, "lollypop.db")
+        TagCache.LOCAL_PATH = path
+        TagCache.DB_PATH = os.path.join(path, "tagcache.db")
+        self.settings = Settings.new(Gio.memory_settings_backend_new())
+        self.settings.set_value('music-path', GLib.Variant('as', [library]))
+        self.settings.set_value('auto-update', GLib.Variant('b', False))
+        # Measure tag reading, not cache hits
+        self.settings.set_value('tag-cache-size', GLib.Variant('i', 0))
+        Gst.init(None)
+        self.db = Database()
+        SqlCursor.add(self.db)
+        self.albums = AlbumsDatabase()
+        self.artists = ArtistsDatabase()
+        self.genres = GenresDatabase()
+        self.tracks = TracksDatabase()
+        self.directories = DirectoriesDatabase()
+        self.checkpoint = CheckpointDatabase()
+        self.quarantine = QuarantineDatabase()
+        self.search = SearchDatabase()
+        self.scanner = CollectionScanner()
+
+        generator = LibraryGenerator(library)
+        started = time()
+        count = generator.generate(artists, albums, tracks)
+        print("Generated %s files in %.2fs" % (count, time() - started))
+        results = []
+        results.append(self._run_case("first scan", [library], count))
+        results.append(self._run_case("no-op rescan", [library], count))
+
+        # Small delta: 1% of files modified, added and removed
+        delta = max(1, count // 100)
+        filepaths = generator.get_files()
+        retagged = filepaths[0:delta]
+        generator.retag(retagged)
+        generator.remove(filepaths[-delta:])
+        generator.add_album("Artist new", "New album", "Rock", delta)
+        results.append(self._run_case("small delta", [library], delta * 3))
+        detected = self._count_retagged(retagged)
+
+        # Mass delete: half of artists
+        removed = generator.remove_artists(max(1, artists // 2))
+        results.append(self._run_case("mass delete", [library], removed))
+        print(self._format(results))
+        print("Retagged in place: %s/%s files read again" %
+              (detected, delta))
+
+    def _run_case(self, name, paths, count):
+        """
+            Run a scan and drain main loop, like after a real scan
+            @param name as str
+            @param paths as [str]
+            @param count as int, files changed on disk
+            @return (name as str, count as int, metrics as dict,
+                     duration as float)
+        """
+        started = time()
+        reporter = self.scanner.update_sync(paths)
+        duration = time() - started
+        context = GLib.MainContext.default()
+        while context.pending():
+            context.iteration(False)
+        if self.debug:
+            print("%s:\n%s" % (name, reporter.dump()))
+        return (name, count, reporter.get_metrics(), duration)
+
+    def _count_retagged(self, filepaths):
+        """
+            Count retagged files having their new title in db
+            @param filepaths as [str]
+            @return int
+        """
+        count = 0
+        for filepath in filepaths:
+            track_id = self.tracks.get_id_by_path(filepath)
+            if track_id is not None and\
+                    self.tracks.get_name(track_id).endswith(" (edit)"):
+                count += 1
+        return count
+
+    def _format(self, results):
+        """
+            Get a table of phase timings
+            @param results as [(str, int, dict, float)]
+            @return str
+        """
+        columns = ["case", "files"] + ScanProgress.PHASES + ["total"]
+        lines = ["%-14s%8s" % tuple(columns[0:2]) +
+                 "".join(["%10s" % column for column in columns[2:]])]
+        for (name, count, metrics, duration) in results:
+            line = "%-14s%8s" % (name, count)
+            for phase in ScanProgress.PHASES:
+                line += "%9.3fs" % metrics[phase]['duration']
+            line += "%9.3fs" % duration
+            if metrics['errors']:
+                line += "  %s errors" % metrics['errors']
+            lines.append(line)
+        return "\n".join(lines)
@@ -0,0 +1,243 @@
+# Copyright (c) 2014-2015 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+class ScanPlan:
+    """
+        Changes between files on disk and tracks in db:
+            - added: [filepath as str]
+            - modified: [(filepath as str, track id as int)]
+            - removed: [(filepath as str, track id as int)]
+            - moved: [(old filepath as str, filepath as str, track id as int)]
+            - refreshed: [(filepath as str, track id as int)],
+              unchanged tracks with a missing fingerprint in db
+    """
+
+    def __init__(self, on_disk, in_db):
+        """
+            Compute plan
+            @param on_disk as {filepath as str:
+                               (mtime as int, size as int, inode as int)}
+            @param in_db as {filepath as str:
+                             (track id as int, mtime as int,
+                              size as int/None, inode as int/None)}
+        """
+        self.on_disk = on_disk
+        self.added = []
+        self.modified = []
+        self.removed = []
+        self.moved = []
+        self.refreshed = []
+        self.unchanged = 0
+        self._compute(in_db)
+
+    def get_read_count(self):
+        """
+            Get files needing a tag read
+            @return int
+        """
+        return len(self.added) + len(self.modified)
+
+    def is_empty(self):
+        """
+            True if there is nothing to do
+            @return bool
+        """
+        return not (self.added or self.modified or self.removed or
+                    self.moved or self.refreshed)
+
+    def get_state(self):
+        """
+            Get plan as a json serializable dict, on disk fingerprints
+            are only kept for files needing work
+            @return dict
+        """
+        filepaths = self.added + [filepath for (filepath, track_id)
+                                  in self.modified + self.refreshed]
+        return {'on_disk': {filepath: self.on_disk[filepath]
+                            for filepath in filepaths},
+                'added': self.added,
+                'modified': self.modified,
+                'removed': self.removed,
+                'moved': self.moved,
+                'refreshed': self.refreshed,
+                'unchanged': self.unchanged}
+
+    def set_state(self, state):
+        """
+            Restore plan from get_state() result
+            @param state as dict
+        """
+        self.on_disk = {filepath: tuple(fingerprint) for (filepath,
+                        fingerprint) in state['on_disk'].items()}
+        self.added = state['added']
+        self.modified = [tuple(item) for item in state['modified']]
+        self.removed = [tuple(item) for item in state['removed']]
+        self.moved = [tuple(item) for item in state['moved']]
+        self.refreshed = [tuple(item) for item in state['refreshed']]
+        self.unchanged = state['unchanged']
+
+    def dump(self):
+        """
+            Get a human readable plan, for debugging
+            @return str
+        """
+        lines = ["%s unchanged, %s added, %s modified, %s removed,"
+                 " %s moved, %s refreshed" % (self.unchanged,
+                                              len(self.added),
+                                              len(self.modified),
+                                              len(self.removed),
+                                              len(self.moved),
+                                              len(self.refreshed))]
+        for filepath in self.added:
+            lines.append("+ %s" % filepath)
+        for (filepath, track_id) in self.modified:
+            lines.append("~ %s" % filepath)
+        for (filepath, track_id) in self.removed:
+            lines.append("- %s" % filepath)
+        for (old_filepath, filepath, track_id) in self.moved:
+            lines.append("> %s -> %s" % (old_filepath, filepath))
+        return "\n".join(lines)
+
+#######################
+# PRIVATE             #
+#######################
+    def _compute(self, in_db):
+        """
+            Compare snapshots, only hash lookups here
+            @param in_db as {filepath as str: (int, int, int, int)}
+        """
+        for (filepath, (mtime, size, inode)) in self.on_disk.items():
+            db = in_db.get(filepath, None)
+            if db is None:
+                self.added.append(filepath)
+                continue
+            (track_id, db_mtime, db_size, db_inode) = db
+            if db_mtime != mtime or\
+                    (db_size is not None and db_size != size):
+                self.modified.append((filepath, track_id))
+            else:
+                self.unchanged += 1
+                if db_size is None or db_inode != inode:
+                    self.refreshed.append((filepath, track_id))
+        for (filepath, db) in in_db.items():
+            if filepath not in self.on_disk:
+                self.removed.append((filepath, db[0]))
+        self._compute_moves(in_db)
+
+    def _compute_moves(self, in_db):
+        """
+            Pair removed and added files sharing inode, size and mtime
+            @param in_db as {filepath as str: (int, int, int, int)}
+        """
+        if not self.added or not self.removed:
+            return
+        removed = {}
+        for (filepath, track_id) in self.removed:
+            (track_id, mtime, size, inode) = in_db[filepath]
+            if inode is not None:
+                removed[(inode, size, mtime)] = (filepath, track_id)
+        if not removed:
+            return
+        added = []
+        for filepath in self.added:
+            (mtime, size, inode) = self.on_disk[filepath]
+            old = removed.pop((inode, size, mtime), None)
+            if old is None:
+                added.append(filepath)
+            else:
+                self.moved.append((old[0], filepath, old[1]))
+        if self.moved:
+            moved_ids = set([track_id for (a, b, track_id) in self.moved])
+            self.added = added
+            self.removed = [(filepath, track_id)
+                            for (filepath, track_id) in self.removed
+                            if track_id not in moved_ids]
+
+
+class MoveDetector:
+    """
+        Pair read files with tracks about to be deleted from db,
+        so their stats survive:
+            - modified files keep stats of their track
+            - added files take stats of a removed track with same
+              tag signature, preferring one with same size
+    """
+
+    def __init__(self, plan, infos):
+        """
+            Init detector
+            @param plan as ScanPlan
+            @param infos as [(int, str, str, int, int, int, int, int)],
+                   see TracksDatabase.get_move_infos()
+        """
+        self._modified = {filepath: track_id
+                          for (filepath, track_id) in plan.modified}
+        removed_ids = set([track_id for (filepath, track_id)
+                           in plan.removed])
+        self._stats = {}
+        self._removed = {}
+        # Moves detected by signature as [(filepath, track id)]
+        self.moved = []
+        for (track_id, name, album_name, duration, tracknumber,
+             size, popularity, ltime) in infos:
+            self._stats[track_id] = (popularity, ltime)
+            if track_id not in removed_ids:
+                continue
+            key = self._get_signature(name, album_name,
+                                      duration, tracknumber)
+            if key in self._removed:
+                self._removed[key].append((size, track_id))
+            else:
+                self._removed[key] = [(size, track_id)]
+
+    def get_stats(self, filepath, fields, size):
+        """
+            Get stats for file
+            @param filepath as str
+            @param fields as {str: value}, see ScannerTagReader.get_fields()
+            @param size as int
+            @return (popularity as int, ltime as int) or None
+        """
+        track_id = self._modified.get(filepath, None)
+        if track_id is not None:
+            return self._stats.get(track_id, None)
+        key = self._get_signature(fields['title'], fields['album_name'],
+                                  fields['duration'], fields['tracknumber'])
+        candidates = self._removed.get(key, None)
+        if not candidates:
+            return None
+        index = 0
+        for i in range(0, len(candidates)):
+            if candidates[i][0] == size:
+                index = i
+                break
+        track_id = candidates.pop(index)[1]
+        self.moved.append((filepath, track_id))
+        return self._stats[track_id]
+
+#######################
+# PRIVATE             #
+#######################
+    def _get_signature(self, title, album_name, duration, tracknumber):
+        """
+            Get tag signature
+            @param title as str
+            @param album_name as str
+            @param duration as int
+            @param tracknumber as int
+            @return tuple
+        """
+        return ((title or "").strip().lower(),
+                (album_name or "").strip().lower(),
+                duration,
+                tracknumber)
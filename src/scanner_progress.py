@@ -0,0 +1,177 @@
+# Copyright (c) 2014-2015 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from gi.repository import GLib
+
+from gettext import gettext as _
+from time import time
+
+
+class ScanProgress:
+    """
+        Scan progress and metrics
+        Counters are written by scanner thread, progress bar is
+        updated from main loop at a fixed rate
+    """
+    PHASES = ['walk', 'diff', 'read', 'write', 'cleanup']
+    # Progress bar updates per second
+    _RATE = 4
+
+    def __init__(self, progress):
+        """
+            Init progress
+            @param progress as Gtk.ProgressBar/None
+        """
+        self._progress = progress
+        self._durations = {phase: 0.0 for phase in self.PHASES}
+        self._counts = {phase: 0 for phase in self.PHASES}
+        self._started = {}
+        self._total = 0
+        self._done = 0
+        self.errors = 0
+        self.missing_codecs = []
+        self._timeout = None
+        if progress is not None:
+            self._timeout = GLib.timeout_add(1000 // self._RATE,
+                                             self._update)
+
+    def set_total(self, total, done=0):
+        """
+            Set files count for progress
+            @param total as int
+            @param done as int, files needing no work
+            @thread safe
+        """
+        self._total = total
+        self._done = done
+
+    def begin(self, phase):
+        """
+            Start timing phase, a phase may run several times
+            @param phase as str
+            @thread safe
+        """
+        self._started[phase] = time()
+
+    def end(self, phase, count=0):
+        """
+            Stop timing phase
+            @param phase as str
+            @param count as int, items processed
+            @thread safe
+        """
+        started = self._started.pop(phase, None)
+        if started is not None:
+            self._durations[phase] += time() - started
+        self._counts[phase] += count
+
+    def add(self, phase, count=1):
+        """
+            Count items processed by phase, read items make progress
+            @param phase as str
+            @param count as int
+            @thread safe
+        """
+        self._counts[phase] += count
+        if phase == 'read':
+            self._done += count
+
+    def add_error(self, filepath, missing_codec=False):
+        """
+            Count a file that can't be read
+            @param filepath as str
+            @param missing_codec as bool
+            @thread safe
+        """
+        self.errors += 1
+        if missing_codec:
+            self.missing_codecs.append(filepath)
+
+    def get_eta(self):
+        """
+            Get remaining time, based on tag read rate
+            @return seconds as int or None
+        """
+        duration = self._durations['read']
+        started = self._started.get('read', None)
+        if started is not None:
+            duration += time() - started
+        count = self._counts['read']
+        if count == 0 or duration == 0:
+            return None
+        return int(max(0, self._total - self._done) * duration / count)
+
+    def get_metrics(self):
+        """
+            Get scan metrics
+            @return {phase as str: {'count': int, 'duration': float,
+                                    'rate': float, files per second},
+                     'errors': int, 'missing_codecs': [str],
+                     'eta': int/None}
+        """
+        metrics = {}
+        for phase in self.PHASES:
+            duration = self._durations[phase]
+            count = self._counts[phase]
+            metrics[phase] = {'count': count,
+                              'duration': duration,
+                              'rate': count / duration if duration else 0.0}
+        metrics['errors'] = self.errors
+        metrics['missing_codecs'] = list(self.missing_codecs)
+        metrics['eta'] = self.get_eta()
+        return metrics
+
+    def dump(self):
+        """
+            Get human readable metrics, for logs
+            @return str
+        """
+        metrics = self.get_metrics()
+        lines = []
+        for phase in self.PHASES:
+            lines.append("%s: %s in %.2fs (%.1f/s)" % (
+                                                phase,
+                                                metrics[phase]['count'],
+                                                metrics[phase]['duration'],
+                                                metrics[phase]['rate']))
+        lines.append("errors: %s, missing codecs: %s" % (
+                                            metrics['errors'],
+                                            len(metrics['missing_codecs'])))
+        return "\n".join(lines)
+
+    def stop(self):
+        """
+            Stop updating progress bar
+        """
+        if self._timeout is not None:
+            GLib.source_remove(self._timeout)
+            self._timeout = None
+        self._progress = None
+
+#######################
+# PRIVATE             #
+#######################
+    def _update(self):
+        """
+            Update progress bar from counters
+        """
+        if self._progress is None:
+            return False
+        if self._total:
+            self._progress.set_fraction(min(1.0, self._done / self._total))
+        eta = self.get_eta()
+        if eta is None:
+            self._progress.set_tooltip_text(None)
+        else:
+            self._progress.set_tooltip_text(
+                        _("%s remaining") % "%d:%02d" % (eta // 60, eta % 60))
+        return True
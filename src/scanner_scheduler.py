@@ -0,0 +1,122 @@
+# Copyright (c) 2014-2015 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import ctypes
+import os
+import platform
+import threading
+from time import sleep, time
+
+from lollypop.define import Lp
+from lollypop.utils import debug
+
+
+class ScanScheduler:
+    """
+        Pace scanner threads with playback:
+            - tag reader threads run at idle cpu and io priority
+            - db writer thread keeps normal priority, main thread
+              writes wait for its transactions
+            - "fast" policy: files are read without delay
+            - "gentle" policy: files are read with a delay
+            - "auto" policy: fast when not playing, gentle when playing
+        Whatever the policy, reading waits while playbin is buffering
+    """
+    # Delay between files when gentle, in seconds
+    _GENTLE_DELAY = 0.05
+    # Max wait per file for playbin buffer to refill, in seconds
+    _MAX_WAIT = 5
+    # ioprio_set syscall number
+    _IOPRIO_SET = {'x86_64': 251, 'i386': 289, 'i686': 289,
+                   'aarch64': 30, 'armv7l': 314}
+    _IOPRIO_WHO_PROCESS = 1
+    _IOPRIO_CLASS_IDLE = 3
+    _IOPRIO_CLASS_SHIFT = 13
+
+    def __init__(self):
+        """
+            Init scheduler, should be called from main thread
+        """
+        self._playing = False
+        self._buffering = 100
+        self._policy = Lp().settings.get_value('scan-policy').get_string()
+        Lp().settings.connect('changed::scan-policy', self._on_policy_changed)
+        # No player when running headless
+        if Lp().player is not None:
+            Lp().player.connect('status-changed', self._on_status_changed)
+            Lp().player.connect('buffering-changed',
+                                self._on_buffering_changed)
+
+    def set_idle_priority(self):
+        """
+            Lower cpu and io priority of calling thread, if supported
+            Main thread is left untouched, synchronous scans run on it
+            @thread safe
+        """
+        if threading.current_thread() is threading.main_thread():
+            return
+        get_native_id = getattr(threading, 'get_native_id', None)
+        if get_native_id is None or not hasattr(os, 'setpriority'):
+            return
+        tid = get_native_id()
+        try:
+            # On Linux, nice value is per thread
+            os.setpriority(os.PRIO_PROCESS, tid, 19)
+            syscall = self._IOPRIO_SET.get(platform.machine(), None)
+            if syscall is not None:
+                libc = ctypes.CDLL(None, use_errno=True)
+                libc.syscall(syscall, self._IOPRIO_WHO_PROCESS, tid,
+                             self._IOPRIO_CLASS_IDLE <<
+                             self._IOPRIO_CLASS_SHIFT)
+        except Exception as e:
+            debug("ScanScheduler::set_idle_priority(): %s" % e)
+
+    def throttle(self):
+        """
+            Wait before reading next file, depending on policy
+            and playbin buffer
+            @thread safe
+        """
+        start = time()
+        while self._buffering < 100 and time() - start < self._MAX_WAIT:
+            sleep(0.1)
+        if self._policy == 'gentle' or\
+                (self._policy == 'auto' and self._playing):
+            sleep(self._GENTLE_DELAY)
+
+#######################
+# PRIVATE             #
+#######################
+    def _on_policy_changed(self, settings, value):
+        """
+            Update policy
+            @param settings as Gio.Settings
+            @param value as GLib.Variant
+        """
+        self._policy = settings.get_value('scan-policy').get_string()
+
+    def _on_status_changed(self, player):
+        """
+            Update playing state
+            @param player as Player
+        """
+        self._playing = player.is_playing()
+        if not self._playing:
+            self._buffering = 100
+
+    def _on_buffering_changed(self, player, percent):
+        """
+            Update buffer level
+            @param player as Player
+            @param percent as int
+        """
+        self._buffering = percent
@@ -0,0 +1,447 @@
+# Copyright (c) 2014-2015 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from gi.repository import Gio, GLib
+
+import os
+from threading import Thread
+
+from lollypop.define import Lp
+from lollypop.utils import is_audio_type, is_pls_type, debug
+
+
+class CollectionWalker:
+    """
+        Walk music paths, only list directories whose mtime changed
+        since last scan, file lists for others come from db
+        Files of unchanged directories are still stat'ed: rewriting a
+        file in place doesn't change its directory mtime
+        Each device gets its own thread, remote mounts are
+        listed with Gio async API
+    """
+    # Never considered as audio, content is not read
+    _SKIPPED_EXTENSIONS = ['jpg', 'jpeg', 'png', 'gif', 'bmp', 'tif',
+                           'tiff', 'webp', 'txt', 'nfo', 'log', 'cue',
+                           'm3u', 'm3u8', 'pls', 'xspf', 'pdf', 'ini',
+                           'db', 'sfv', 'md5', 'accurip', 'lrc']
+    _REMOTE_ATTRIBUTES = 'standard::name,standard::type,standard::size,'\
+                         'standard::fast-content-type,time::modified,'\
+                         'time::modified-usec,unix::inode'
+    # Directories listed at once on remote mounts
+    _REMOTE_CONCURRENCY = 8
+
+    def __init__(self, index, in_db, full=False):
+        """
+            Init walker
+            @param index as {path as str: (mtime as int, count as int)}
+            @param in_db as {filepath as str:
+                             (track id as int, mtime as int,
+                              size as int/None, inode as int/None)}
+            @param full as bool, ignore index if True
+        """
+        self._index = index
+        self._full = full
+        self._audio_extensions = set(
+                    Lp().settings.get_value('audio-extensions').unpack())
+        # Changed directories as {path: (mtime, count)}
+        self.changed = {}
+        self._visited = set()
+        self._files = {}
+        self._children = {}
+        if not full:
+            for filepath in in_db.keys():
+                dirname = os.path.dirname(filepath)
+                if dirname in self._files:
+                    self._files[dirname].append(filepath)
+                else:
+                    self._files[dirname] = [filepath]
+            for path in index.keys():
+                dirname = os.path.dirname(path)
+                if dirname in self._children:
+                    self._children[dirname].append(path)
+                else:
+                    self._children[dirname] = [path]
+
+    def walk(self, paths):
+        """
+            Return all tracks/dirs for paths
+            Paths on different devices are walked in parallel
+            @param paths as [str]
+            @return ({track path: (mtime, size, inode)}, [dirs path],
+                     track count)
+        """
+        tracks = {}
+        dirs = []
+        groups = self._group_by_device(paths)
+        if len(groups) == 1:
+            (remote, group) = groups[0]
+            self._walk_group(remote, group, tracks, dirs)
+        else:
+            threads = []
+            results = []
+            for (remote, group) in groups:
+                result = ({}, [])
+                results.append(result)
+                thread = Thread(target=self._walk_group,
+                                args=(remote, group) + result)
+                thread.daemon = True
+                thread.start()
+                threads.append(thread)
+            for thread in threads:
+                thread.join()
+            for (group_tracks, group_dirs) in results:
+                tracks.update(group_tracks)
+                dirs += group_dirs
+        return (tracks, dirs, len(tracks))
+
+    def stat_files(self, filepaths):
+        """
+            Return audio files in filepaths
+            @param filepaths as [str]
+            @return {track path: (mtime, size, inode)}
+        """
+        tracks = {}
+        unknowns = {}
+        for filepath in filepaths:
+            extension = os.path.splitext(filepath)[1][1:].lower()
+            if extension in self._audio_extensions:
+                self._add_file(tracks, filepath)
+            elif extension not in self._SKIPPED_EXTENSIONS:
+                dirname = os.path.dirname(filepath)
+                if dirname in unknowns:
+                    unknowns[dirname].append(os.path.basename(filepath))
+                else:
+                    unknowns[dirname] = [os.path.basename(filepath)]
+        for (dirname, names) in unknowns.items():
+            try:
+                for name in self._get_audio_names(dirname, names):
+                    self._add_file(tracks, os.path.join(dirname, name))
+            except Exception as e:
+                print("CollectionWalker::stat_files(): %s" % e)
+        return tracks
+
+    def is_visited(self, path):
+        """
+            True if directory has been found by last walk
+            @param path as str
+            @return bool
+        """
+        return path in self._visited
+
+    def get_removed(self):
+        """
+            Get indexed directories not found by last walk
+            @return [str]
+        """
+        return [path for path in self._index.keys()
+                if path not in self._visited]
+
+#######################
+# PRIVATE             #
+#######################
+    def _group_by_device(self, paths):
+        """
+            Group paths by backing device
+            @param paths as [str]
+            @return [(remote as bool, [str])]
+        """
+        groups = {}
+        for path in paths:
+            try:
+                device = os.stat(path).st_dev
+                info = Gio.File.new_for_path(path).query_filesystem_info(
+                                                    'filesystem::remote',
+                                                    None)
+                remote = info.get_attribute_boolean('filesystem::remote')
+            except Exception as e:
+                print("CollectionWalker::_group_by_device(): %s" % e)
+                continue
+            if device in groups:
+                groups[device][1].append(path)
+            else:
+                groups[device] = (remote, [path])
+        return list(groups.values())
+
+    def _walk_group(self, remote, paths, tracks, dirs):
+        """
+            Walk paths on a same device
+            @param remote as bool
+            @param paths as [str]
+            @param tracks as {str: (int, int, int)}
+            @param dirs as [str]
+            @thread safe
+        """
+        if remote:
+            skipped = self._walk_remote(paths, tracks, dirs)
+        else:
+            skipped = self._walk_local(paths, tracks, dirs)
+        debug("CollectionWalker::_walk_group(): %s, %s directories,"
+              " %s unchanged" % (paths, len(dirs), skipped))
+
+    def _walk_local(self, paths, tracks, dirs):
+        """
+            Walk local paths
+            @param paths as [str]
+            @param tracks as {str: (int, int, int)}
+            @param dirs as [str]
+            @return unchanged directories count as int
+        """
+        skipped = 0
+        stack = list(paths)
+        while stack:
+            path = stack.pop()
+            if path in self._visited:
+                continue
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except Exception as e:
+                print("CollectionWalker::_walk_local(): %s" % e)
+                continue
+            if self._is_unchanged(path, mtime, tracks, dirs):
+                skipped += 1
+                stack += self._children.get(path, [])
+            else:
+                stack += self._list(path, mtime, tracks)
+        return skipped
+
+    def _walk_remote(self, paths, tracks, dirs):
+        """
+            Walk remote paths with Gio async enumeration, several
+            directories being listed at once to hide latency
+            @param paths as [str]
+            @param tracks as {str: (int, int, int)}
+            @param dirs as [str]
+            @return unchanged directories count as int
+        """
+        context = GLib.MainContext.new()
+        context.push_thread_default()
+        loop = GLib.MainLoop.new(context, False)
+        flags = Gio.FileQueryInfoFlags.NOFOLLOW_SYMLINKS
+        # Directories to handle as [(path, mtime or None if unknown)]
+        queue = [(path, None) for path in paths]
+        running = []
+        skipped = [0]
+
+        def start():
+            while queue and len(running) < self._REMOTE_CONCURRENCY:
+                (path, mtime) = queue.pop()
+                if path in self._visited:
+                    continue
+                f = Gio.File.new_for_path(path)
+                if mtime is None:
+                    running.append(path)
+                    f.query_info_async(self._REMOTE_ATTRIBUTES, flags,
+                                       GLib.PRIORITY_LOW, None,
+                                       on_info, path)
+                elif self._is_unchanged(path, mtime, tracks, dirs):
+                    skipped[0] += 1
+                    queue.extend([(child, None) for child
+                                  in self._children.get(path, [])])
+                else:
+                    running.append(path)
+                    f.enumerate_children_async(self._REMOTE_ATTRIBUTES,
+                                               flags, GLib.PRIORITY_LOW,
+                                               None, on_enumerated,
+                                               (path, mtime))
+            if not running:
+                loop.quit()
+
+        def on_info(f, result, path):
+            try:
+                info = f.query_info_finish(result)
+                queue.append((path, self._get_mtime_ns(info)))
+            except Exception as e:
+                print("CollectionWalker::_walk_remote(): %s" % e)
+            running.remove(path)
+            start()
+
+        def on_enumerated(f, result, data):
+            try:
+                enumerator = f.enumerate_children_finish(result)
+                enumerator.next_files_async(100, GLib.PRIORITY_LOW, None,
+                                            on_next, data + ([],))
+            except Exception as e:
+                print("CollectionWalker::_walk_remote(): %s" % e)
+                running.remove(data[0])
+                start()
+
+        def on_next(enumerator, result, data):
+            (path, mtime, infos) = data
+            try:
+                next_infos = enumerator.next_files_finish(result)
+                if next_infos:
+                    infos += next_infos
+                    enumerator.next_files_async(100, GLib.PRIORITY_LOW,
+                                                None, on_next, data)
+                    return
+                enumerator.close(None)
+                queue.extend(self._add_infos(path, mtime, infos, tracks))
+            except Exception as e:
+                print("CollectionWalker::_walk_remote(): %s" % e)
+            running.remove(path)
+            start()
+
+        start()
+        if running:
+            loop.run()
+        context.pop_thread_default()
+        return skipped[0]
+
+    def _add_infos(self, path, mtime, infos, tracks):
+        """
+            Add audio files from remote directory listing to tracks
+            @param path as str
+            @param mtime as int
+            @param infos as [Gio.FileInfo]
+            @param tracks as {str: (int, int, int)}
+            @return subdirectories as [(str, int)]
+        """
+        subdirs = []
+        for info in infos:
+            filepath = os.path.join(path, info.get_name())
+            file_type = info.get_file_type()
+            if file_type == Gio.FileType.DIRECTORY:
+                subdirs.append((filepath, self._get_mtime_ns(info)))
+                continue
+            elif file_type != Gio.FileType.REGULAR:
+                continue
+            extension = os.path.splitext(filepath)[1][1:].lower()
+            if extension not in self._audio_extensions:
+                if extension in self._SKIPPED_EXTENSIONS:
+                    continue
+                content_type = info.get_attribute_string(
+                                                'standard::fast-content-type')
+                if not is_audio_type(content_type) or\
+                        is_pls_type(content_type):
+                    continue
+            tracks[filepath] = (
+                        info.get_attribute_uint64('time::modified'),
+                        info.get_size(),
+                        info.get_attribute_uint64('unix::inode'))
+        self.changed[path] = (mtime, len(infos))
+        return subdirs
+
+    def _get_mtime_ns(self, info):
+        """
+            Get modification time from file info
+            @param info as Gio.FileInfo
+            @return int
+        """
+        return info.get_attribute_uint64('time::modified') * 1000000000 +\
+            info.get_attribute_uint32('time::modified-usec') * 1000
+
+    def _is_unchanged(self, path, mtime, tracks, dirs):
+        """
+            Mark directory as visited, stat its known tracks if unchanged
+            @param path as str
+            @param mtime as int
+            @param tracks as {str: (int, int, int)}
+            @param dirs as [str]
+            @return True if unchanged
+        """
+        self._visited.add(path)
+        dirs.append(path)
+        cached = self._index.get(path, None)
+        if self._full or cached is None or cached[0] != mtime:
+            return False
+        for filepath in self._files.get(path, []):
+            self._add_file(tracks, filepath)
+        return True
+
+    def _list(self, path, mtime, tracks):
+        """
+            List directory content, add audio files to tracks
+            @param path as str
+            @param mtime as int
+            @param tracks as {str: (int, int, int)}
+            @return subdirectories as [str]
+        """
+        subdirs = []
+        unknowns = {}
+        count = 0
+        try:
+            for entry in os.scandir(path):
+                count += 1
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                    continue
+                extension = os.path.splitext(entry.name)[1][1:].lower()
+                if extension in self._audio_extensions:
+                    self._add_entry(tracks, entry)
+                elif extension not in self._SKIPPED_EXTENSIONS:
+                    unknowns[entry.name] = entry
+            # Only sniff content for unknown extensions
+            if unknowns:
+                for name in self._get_audio_names(path, unknowns.keys()):
+                    self._add_entry(tracks, unknowns[name])
+        except Exception as e:
+            print("CollectionWalker::_list(): %s" % e)
+            return subdirs
+        self.changed[path] = (mtime, count)
+        return subdirs
+
+    def _get_audio_names(self, path, names):
+        """
+            Get audio files in names, content types for the whole
+            directory are queried at once
+            @param path as str
+            @param names as [str]
+            @return [str]
+        """
+        audio_names = []
+        names = set(names)
+        d = Gio.File.new_for_path(path)
+        infos = d.enumerate_children('standard::name,standard::content-type',
+                                     Gio.FileQueryInfoFlags.NONE,
+                                     None)
+        for info in infos:
+            name = info.get_name()
+            if name not in names:
+                continue
+            content_type = info.get_content_type()
+            if is_pls_type(content_type):
+                pass
+            elif is_audio_type(content_type):
+                audio_names.append(name)
+            else:
+                debug("%s not detected as a music file" %
+                      os.path.join(path, name))
+        infos.close(None)
+        return audio_names
+
+    def _add_entry(self, tracks, entry):
+        """
+            Add a directory entry to tracks
+            @param tracks as {str: (int, int, int)}
+            @param entry as os.DirEntry
+        """
+        try:
+            stat = entry.stat()
+            tracks[entry.path] = (int(stat.st_mtime),
+                                  stat.st_size,
+                                  stat.st_ino)
+        except Exception as e:
+            print("CollectionWalker::_add_entry(): %s" % e)
+
+    def _add_file(self, tracks, filepath):
+        """
+            Stat file and add it to tracks
+            @param tracks as {str: (int, int, int)}
+            @param filepath as str
+        """
+        try:
+            stat = os.stat(filepath)
+            tracks[filepath] = (int(stat.st_mtime),
+                                stat.st_size,
+                                stat.st_ino)
+        except:
+            pass
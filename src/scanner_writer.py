@@ -0,0 +1,353 @@
+# Copyright (c) 2014-2015 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+
+from lollypop.sqlcursor import SqlCursor
+from lollypop.database_search import SearchDatabase
+from lollypop.define import Lp, Type
+from lollypop.utils import format_artist_name
+
+
+class ScanWriter:
+    """
+        Scan session writer:
+            - artists, genres and albums ids are resolved from memory
+            - new rows get their id from the writer and are queued
+            - queued rows are written with executemany() on flush
+        Per row DAO methods should not be used to write while a
+        session is open
+    """
+
+    def __init__(self):
+        """
+            Init writer, load name to id maps from db
+            @thread safe
+        """
+        # Ids of albums created by this session
+        self.new_album_ids = []
+        with SqlCursor(Lp().db) as sql:
+            self._artists = {}
+            self._sortnames = {}
+            result = sql.execute("SELECT rowid, name, sortname FROM artists")
+            for (artist_id, name, sortname) in result:
+                self._artists[name] = artist_id
+                self._sortnames[artist_id] = sortname
+            result = sql.execute("SELECT rowid, name FROM genres")
+            self._genres = {name: genre_id for (genre_id, name) in result}
+            self._albums = {}
+            self._album_artist_ids = {}
+            self._album_paths = {}
+            result = sql.execute("SELECT rowid, name, artist_id, year,\
+                                  no_album_artist, path FROM albums")
+            for (album_id, name, artist_id, year,
+                 no_album_artist, path) in result:
+                key = self._get_album_key(name, artist_id, year,
+                                          no_album_artist)
+                self._albums[key] = album_id
+                self._album_artist_ids[album_id] = artist_id
+                self._album_paths[album_id] = path
+            result = sql.execute("SELECT album_id, genre_id\
+                                  FROM album_genres")
+            self._album_genres = set(result)
+            # Track artists for albums without album artist
+            self._compilations = {}
+            result = sql.execute("SELECT DISTINCT tracks.album_id,\
+                                  track_artists.artist_id\
+                                  FROM albums, tracks, track_artists\
+                                  WHERE albums.no_album_artist=1\
+                                  AND tracks.album_id=albums.rowid\
+                                  AND track_artists.track_id=tracks.rowid")
+            for (album_id, artist_id) in result:
+                if album_id in self._compilations:
+                    self._compilations[album_id].add(artist_id)
+                else:
+                    self._compilations[album_id] = set([artist_id])
+            self._next_ids = {}
+            for table in ['artists', 'genres', 'albums', 'tracks']:
+                result = sql.execute("SELECT MAX(rowid) FROM %s" % table)
+                v = result.fetchone()
+                self._next_ids[table] = (v[0] or 0) + 1
+        self._reset()
+
+    def add(self, title, filepath, duration, tracknumber, discnumber, year,
+            artists, sortname, album_artist, album_name, genres,
+            popularity, ltime, mtime, size, inode):
+        """
+            Queue a new track
+            @param title as str
+            @param filepath as str
+            @param duration as int
+            @param tracknumber as int
+            @param discnumber as int
+            @param year as int
+            @param artists as str "artist1;artist2;..."
+            @param sortname as str
+            @param album_artist as str
+            @param album_name as str
+            @param genres as str "genre1;genre2;..."
+            @param popularity as int
+            @param ltime as int
+            @param mtime as int
+            @param size as int
+            @param inode as int
+            @return track id as int
+        """
+        (artist_ids, new_artist_ids) = self._add_artists(artists,
+                                                         album_artist,
+                                                         sortname)
+        album_artist_id = None
+        if album_artist:
+            album_artist_id = self._artists.get(album_artist, None)
+            if album_artist_id is None:
+                album_artist_id = self._add_artist(
+                                            album_artist,
+                                            format_artist_name(album_artist))
+                new_artist_ids.append(album_artist_id)
+
+        # Check for album artist, if none, use first available artist
+        no_album_artist = False
+        if album_artist_id is None:
+            album_artist_id = artist_ids[0]
+            no_album_artist = True
+
+        album_id = self._add_album(album_name, album_artist_id,
+                                   no_album_artist, year, filepath,
+                                   artist_ids, mtime)
+
+        genre_ids = []
+        for genre in genres.split(';'):
+            genre_id = self._genres.get(genre, None)
+            if genre_id is None:
+                genre_id = self._get_next_id('genres')
+                self._genres[genre] = genre_id
+                self._new_genres.append((genre_id, genre))
+                self.genre_signals.append(genre_id)
+            if genre_id not in genre_ids:
+                genre_ids.append(genre_id)
+            if (album_id, genre_id) not in self._album_genres:
+                self._album_genres.add((album_id, genre_id))
+                self._new_album_genres.append((album_id, genre_id))
+
+        (count, total) = self._album_deltas.get(album_id, (0, 0))
+        self._album_deltas[album_id] = (count + 1, total + (duration or 0))
+
+        track_id = self._get_next_id('tracks')
+        self._new_tracks.append((track_id, title, filepath, duration,
+                                 tracknumber, discnumber, album_id, year,
+                                 popularity, ltime, mtime, size, inode,
+                                 os.path.basename(filepath)))
+        for artist_id in artist_ids:
+            self._new_track_artists.append((track_id, artist_id))
+        for genre_id in genre_ids:
+            self._new_track_genres.append((track_id, genre_id))
+        for artist_id in new_artist_ids:
+            self.artist_signals.append((artist_id, album_id))
+        return track_id
+
+    def get_pending(self):
+        """
+            Get queued tracks count
+            @return int
+        """
+        return len(self._new_tracks)
+
+    def flush(self):
+        """
+            Write queued rows to db
+            @return (artist signals as [(artist id, album id)],
+                     genre signals as [genre id])
+            @commit needed
+        """
+        with SqlCursor(Lp().db) as sql:
+            sql.executemany("INSERT INTO artists (rowid, name, sortname)\
+                             VALUES (?, ?, ?)", self._new_artists)
+            sql.executemany("UPDATE artists SET sortname=? WHERE rowid=?",
+                            [(self._sortnames[artist_id], artist_id)
+                             for artist_id in self._dirty_artists])
+            sql.executemany("INSERT INTO genres (rowid, name)\
+                             VALUES (?, ?)", self._new_genres)
+            sql.executemany("INSERT INTO albums (rowid, name, artist_id,\
+                             no_album_artist, year, path, popularity, mtime)\
+                             VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            [(album_id, name,
+                              self._album_artist_ids[album_id],
+                              no_album_artist, year,
+                              self._album_paths[album_id], 0, mtime)
+                             for (album_id, name, no_album_artist,
+                                  year, mtime) in self._new_albums])
+            sql.executemany("UPDATE albums SET artist_id=?, path=?\
+                             WHERE rowid=?",
+                            [(self._album_artist_ids[album_id],
+                              self._album_paths[album_id],
+                              album_id)
+                             for album_id in self._dirty_albums])
+            Lp().albums.update_signatures(
+                                    self._album_deltas,
+                                    {album_id: name for (album_id, name,
+                                                         no_album_artist,
+                                                         year, mtime)
+                                     in self._new_albums})
+            sql.executemany("INSERT OR IGNORE INTO album_genres\
+                             (album_id, genre_id)\
+                             VALUES (?, ?)", self._new_album_genres)
+            sql.executemany("INSERT INTO tracks (rowid, name, filepath,\
+                             duration, tracknumber, discnumber, album_id,\
+                             year, popularity, ltime, mtime, size, inode,\
+                             basename)\
+                             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,\
+                                     ?)",
+                            self._new_tracks)
+            sql.executemany("INSERT OR IGNORE INTO track_artists\
+                             (track_id, artist_id)\
+                             VALUES (?, ?)", self._new_track_artists)
+            sql.executemany("INSERT OR IGNORE INTO track_genres\
+                             (track_id, genre_id)\
+                             VALUES (?, ?)", self._new_track_genres)
+            Lp().search.add(SearchDatabase.ARTIST,
+                            [artist_id for (artist_id, name, sortname)
+                             in self._new_artists])
+            Lp().search.add(SearchDatabase.ALBUM,
+                            [row[0] for row in self._new_albums])
+            Lp().search.add(SearchDatabase.TRACK,
+                            [row[0] for row in self._new_tracks])
+        signals = (self.artist_signals, self.genre_signals)
+        self._reset()
+        return signals
+
+#######################
+# PRIVATE             #
+#######################
+    def _reset(self):
+        """
+            Clear queues
+        """
+        self._new_artists = []
+        self._dirty_artists = set()
+        self._new_genres = []
+        self._new_albums = []
+        self._dirty_albums = set()
+        self._album_deltas = {}
+        self._new_album_genres = []
+        self._new_tracks = []
+        self._new_track_artists = []
+        self._new_track_genres = []
+        self.artist_signals = []
+        self.genre_signals = []
+
+    def _get_next_id(self, table):
+        """
+            Reserve a rowid in table
+            @param table as str
+            @return int
+        """
+        rowid = self._next_ids[table]
+        self._next_ids[table] += 1
+        return rowid
+
+    def _get_album_key(self, name, artist_id, year, no_album_artist):
+        """
+            Get album lookup key, artist is ignored for compilations
+            @param name as str
+            @param artist_id as int
+            @param year as int
+            @param no_album_artist as bool
+            @return tuple
+        """
+        if no_album_artist:
+            return (name, None, year, True)
+        else:
+            return (name, artist_id, year, False)
+
+    def _add_artist(self, name, sortname):
+        """
+            Queue a new artist
+            @param name as str
+            @param sortname as str
+            @return artist id as int
+        """
+        if sortname == "":
+            sortname = format_artist_name(name)
+        artist_id = self._get_next_id('artists')
+        self._artists[name] = artist_id
+        self._sortnames[artist_id] = sortname
+        self._new_artists.append((artist_id, name, sortname))
+        return artist_id
+
+    def _add_artists(self, artists, album_artist, sortname):
+        """
+            Get artist ids, queue missing artists
+            @param artists as str "artist1;artist2;..."
+            @param album_artist as str
+            @param sortname as str
+            @return ([artist ids as int], [new artist ids as int])
+        """
+        artist_ids = []
+        new_artist_ids = []
+        for artist in artists.split(';'):
+            artist_id = self._artists.get(artist, None)
+            if artist_id is None:
+                artist_id = self._add_artist(artist, sortname)
+                if artist == album_artist:
+                    new_artist_ids.append(artist_id)
+            elif sortname != "" and self._sortnames[artist_id] != sortname:
+                self._sortnames[artist_id] = sortname
+                self._dirty_artists.add(artist_id)
+            if artist_id not in artist_ids:
+                artist_ids.append(artist_id)
+        return (artist_ids, new_artist_ids)
+
+    def _add_album(self, name, artist_id, no_album_artist, year,
+                   filepath, artist_ids, mtime):
+        """
+            Get album id, queue album if missing
+            @param name as str
+            @param artist_id as int
+            @param no_album_artist as bool
+            @param year as int
+            @param filepath as str
+            @param artist_ids as [int], track artists
+            @param mtime as int
+            @return album id as int
+        """
+        path = os.path.dirname(filepath)
+        key = self._get_album_key(name, artist_id, year, no_album_artist)
+        album_id = self._albums.get(key, None)
+        if album_id is None:
+            album_id = self._get_next_id('albums')
+            self._albums[key] = album_id
+            self._album_artist_ids[album_id] = artist_id
+            self._album_paths[album_id] = path
+            self._new_albums.append((album_id, name, no_album_artist,
+                                     year, mtime))
+            self.new_album_ids.append(album_id)
+            new = True
+        else:
+            new = False
+            # Now we have our album id, check if path doesn't change
+            if self._album_paths[album_id] != path:
+                self._album_paths[album_id] = path
+                self._dirty_albums.add(album_id)
+
+        # If no album artist, handle album artist id for compilations
+        if no_album_artist:
+            if album_id in self._compilations:
+                self._compilations[album_id] |= set(artist_ids)
+            else:
+                self._compilations[album_id] = set(artist_ids)
+            if len(self._compilations[album_id]) > 1:
+                artist_id = Type.COMPILATIONS
+            if self._album_artist_ids[album_id] != artist_id:
+                self._album_artist_ids[album_id] = artist_id
+                if not new:
+                    self._dirty_albums.add(album_id)
+        return album_id
@@ -80,6 +80,8 @@ class SelectionList(Gtk.ScrolledWindow):
         self._timeout = None
         self._to_select_id = Type.NONE
         self._updating = False       # Sort disabled if False
+        # Artist sortnames cache, while adding values
+        self._sortnames = None
         self._is_artists = False
         self._popover = SelectionPopover()
         builder = Gtk.Builder()
@@ -154,6 +156,26 @@ class SelectionList(Gtk.ScrolledWindow):
         self._add_value(value)
         self._updating = False
 
+    def add_values(self, values):
+        """
+            Add items to list, items already in list are ignored
+            @param values as [(int, str)]
+        """
+        item_ids = set([item[0] for item in self._model])
+        new_values = []
+        for value in values:
+            if value[0] not in item_ids:
+                item_ids.add(value[0])
+                new_values.append(value)
+        if not new_values:
+            return
+        self._updating = True
+        # Only query artist sortnames once
+        self._sortnames = {}
+        self._add_values(new_values)
+        self._sortnames = None
+        self._updating = False
+
     def update_value(self, object_id, name):
         """
             Update object with new name
@@ -185,9 +207,10 @@ class SelectionList(Gtk.ScrolledWindow):
                 self._model.remove(item.iter)
         # Add items which are not already in the list
         item_ids = set([i[0] for i in self._model])
-        for value in values:
-            if not value[0] in item_ids:
-                self._add_value(value)
+        self._sortnames = {}
+        self._add_values([value for value in values
+                          if value[0] not in item_ids])
+        self._sortnames = None
         self._updating = False
 
     def get_value(self, object_id):
@@ -271,8 +294,17 @@ class SelectionList(Gtk.ScrolledWindow):
             @param items as [(int,str)]
             @thread safe
         """
+        if not self._updating:
+            for value in values:
+                self._add_value(value)
+            return
+        # Sort model once, not on each insertion
+        self._model.set_sort_column_id(
+                                    Gtk.TREE_SORTABLE_UNSORTED_SORT_COLUMN_ID,
+                                    Gtk.SortType.ASCENDING)
         for value in values:
             self._add_value(value)
+        self._model.set_sort_column_id(0, Gtk.SortType.ASCENDING)
 
     def _get_icon_name(self, object_id):
         """
@@ -331,13 +363,27 @@ class SelectionList(Gtk.ScrolledWindow):
         # String comparaison for non static
         else:
             if self._is_artists:
-                a = Lp().artists.get_sortname(a_index)
-                b = Lp().artists.get_sortname(b_index)
+                a = self._get_sortname(a_index)
+                b = self._get_sortname(b_index)
             else:
                 a = model.get_value(itera, 1)
                 b = model.get_value(iterb, 1)
             return a.lower() > b.lower()
 
+    def _get_sortname(self, artist_id):
+        """
+            Get artist sortname, cached while adding values
+            @param artist id as int
+            @return str
+        """
+        if self._sortnames is None:
+            return Lp().artists.get_sortname(artist_id)
+        sortname = self._sortnames.get(artist_id, None)
+        if sortname is None:
+            sortname = Lp().artists.get_sortname(artist_id)
+            self._sortnames[artist_id] = sortname
+        return sortname
+
     def _row_separator_func(self, model, iterator):
         """
             Draw a separator if needed
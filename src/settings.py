@@ -35,11 +35,16 @@ class Settings(Gio.Settings):
         """
         Gio.Settings.__init__(self)
 
-    def new():
+    def new(backend=None):
         """
             Return a new Settings object
+            @param backend as Gio.SettingsBackend, default to dconf
         """
-        settings = Gio.Settings.new('org.gnome.Lollypop')
+        if backend is None:
+            settings = Gio.Settings.new('org.gnome.Lollypop')
+        else:
+            settings = Gio.Settings.new_with_backend('org.gnome.Lollypop',
+                                                     backend)
         settings.__class__ = Settings
         return settings
 
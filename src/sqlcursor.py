@@ -11,45 +11,107 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-from threading import current_thread
-
-from lollypop.define import Lp
+from threading import local
 
 
 class SqlCursor:
     """
         Context manager to get the SQL cursor
+        One connection is kept per thread and per database object class,
+        so connections and their prepared statements are reused
     """
+    # {class name as str: [connection, depth as int, pinned as bool]}
+    _local = local()
+
     def add(obj):
         """
-            Add cursor to thread list
-            Raise an exception if cursor already exists
+            Pin connection for calling thread: its pending changes
+            are kept when leaving the outermost context
+            @param obj as Database/Playlists/Radios/TagCache
         """
-        name = current_thread().getName() + obj.__class__.__name__
-        Lp().cursors[name] = obj.get_cursor()
+        SqlCursor._get_entry(obj)[2] = True
 
     def __init__(self, obj):
         """
             Init object
         """
         self._obj = obj
-        self._creator = False
 
     def __enter__(self):
         """
-            Return cursor for thread, create a new one if needed
+            Return connection for thread, create a new one if needed
+        """
+        entry = SqlCursor._get_entry(self._obj)
+        entry[1] += 1
+        return entry[0]
+
+    def __exit__(self, type, value, traceback):
+        """
+            On outermost context, drop uncommitted changes,
+            as closing connection used to do
+        """
+        entry = SqlCursor._get_entry(self._obj)
+        entry[1] -= 1
+        if entry[1] == 0 and not entry[2] and entry[0].in_transaction:
+            entry[0].rollback()
+
+#######################
+# PRIVATE             #
+#######################
+    def _get_entry(obj):
+        """
+            Get connection entry of calling thread for obj
+            @param obj as Database/Playlists/Radios/TagCache
+            @return [connection, depth as int, pinned as bool]
+        """
+        connections = getattr(SqlCursor._local, 'connections', None)
+        if connections is None:
+            connections = {}
+            SqlCursor._local.connections = connections
+        name = obj.__class__.__name__
+        entry = connections.get(name, None)
+        if entry is None:
+            entry = [obj.get_cursor(), 0, False]
+            connections[name] = entry
+        return entry
+
+
+class SqlSnapshot:
+    """
+        Context manager for read only queries on a consistent snapshot,
+        DAO calls made from calling thread in context use it
+        With WAL, reading a snapshot never waits on writer
+    """
+
+    def __init__(self, obj, generation=0):
+        """
+            Init object
+            @param obj as Database
+            @param generation as int, library generation when created
+        """
+        self._cursor = SqlCursor(obj)
+        self._sql = None
+        self._begun = False
+        self.generation = generation
+
+    def __enter__(self):
+        """
+            Start snapshot, unless thread is already in a transaction
         """
-        name = current_thread().getName() + self._obj.__class__.__name__
-        if name not in Lp().cursors:
-            self._creator = True
-            Lp().cursors[name] = self._obj.get_cursor()
-        return Lp().cursors[name]
+        self._sql = self._cursor.__enter__()
+        if not self._sql.in_transaction:
+            self._sql.execute("PRAGMA query_only=ON")
+            self._sql.execute("BEGIN")
+            # Snapshot is taken by first read
+            self._sql.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+            self._begun = True
+        return self._sql
 
     def __exit__(self, type, value, traceback):
         """
-            If creator, close cursor and remove it
+            End snapshot
         """
-        if self._creator:
-            name = current_thread().getName() + self._obj.__class__.__name__
-            Lp().cursors[name].close()
-            del Lp().cursors[name]
+        if self._begun:
+            self._sql.rollback()
+            self._sql.execute("PRAGMA query_only=OFF")
+        self._cursor.__exit__(type, value, traceback)
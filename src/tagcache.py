@@ -0,0 +1,161 @@
+# Copyright (c) 2014-2015 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import sqlite3
+from time import time
+
+from lollypop.sqlcursor import SqlCursor
+from lollypop.tagreader import ScannerTagReader
+
+
+class TagCache:
+    """
+        Fields read by scanner, keyed by file fingerprint
+        Kept outside of main db so it survives a db reset
+    """
+    LOCAL_PATH = os.path.expanduser("~") + "/.local/share/lollypop"
+    DB_PATH = "%s/tagcache.db" % LOCAL_PATH
+
+    create_tags = '''CREATE TABLE IF NOT EXISTS tags (
+                        filepath TEXT NOT NULL UNIQUE,
+                        mtime INT NOT NULL,
+                        size INT NOT NULL,
+                        inode INT NOT NULL,
+                        ctime INT NOT NULL,
+                        title TEXT,
+                        artists TEXT,
+                        sortname TEXT,
+                        album_artist TEXT,
+                        album_name TEXT,
+                        genres TEXT,
+                        discnumber INT,
+                        tracknumber INT,
+                        year INT,
+                        duration INT)'''
+
+    def __init__(self, max_size):
+        """
+            Init tag cache
+            @param max_size as int, max entries, 0 disable cache
+        """
+        self._max_size = max_size
+        self._pending = []
+        # Entries written by this object, size limit is only checked then
+        self._written = 0
+        if max_size == 0:
+            return
+        if not os.path.exists(self.LOCAL_PATH):
+            os.mkdir(self.LOCAL_PATH)
+        with SqlCursor(self) as sql:
+            sql.execute(self.create_tags)
+            sql.commit()
+
+    def is_enabled(self):
+        """
+            True if cache is enabled
+            @return bool
+        """
+        return self._max_size != 0
+
+    def get(self, files):
+        """
+            Get cached fields for files
+            @param files as [(filepath as str,
+                              (mtime as int, size as int, inode as int))]
+            @return {filepath as str: {field as str: value}}
+        """
+        cached = {}
+        if not self.is_enabled() or not files:
+            return cached
+        request = "SELECT %s FROM tags WHERE filepath=?\
+                   AND mtime=? AND size=? AND inode=?" %\
+                  ", ".join(ScannerTagReader.FIELDS)
+        with SqlCursor(self) as sql:
+            for (filepath, fingerprint) in files:
+                result = sql.execute(request,
+                                     (filepath,) + tuple(fingerprint))
+                v = result.fetchone()
+                if v is not None:
+                    cached[filepath] = dict(zip(ScannerTagReader.FIELDS, v))
+        return cached
+
+    def add(self, filepath, fingerprint, fields):
+        """
+            Queue fields for file, see flush()
+            @param filepath as str
+            @param fingerprint as (mtime as int, size as int, inode as int)
+            @param fields as {field as str: value}
+        """
+        if not self.is_enabled():
+            return
+        self._pending.append((filepath,) + tuple(fingerprint) +
+                             (int(time()),) +
+                             tuple([fields[field] for field
+                                    in ScannerTagReader.FIELDS]))
+
+    def flush(self):
+        """
+            Write queued entries
+        """
+        if not self._pending:
+            return
+        with SqlCursor(self) as sql:
+            sql.executemany("INSERT OR REPLACE INTO tags\
+                             (filepath, mtime, size, inode, ctime, %s)\
+                             VALUES (%s)" % (
+                                ", ".join(ScannerTagReader.FIELDS),
+                                ", ".join(["?"] *
+                                          (len(ScannerTagReader.FIELDS) + 5))),
+                            self._pending)
+            sql.commit()
+        self._written += len(self._pending)
+        self._pending = []
+
+    def prune(self, filepaths):
+        """
+            Remove entries of removed files, then oldest entries over
+            size limit if entries have been written
+            Nothing is read when there is nothing to remove
+            @param filepaths as [str]
+        """
+        if not self.is_enabled() or (not filepaths and not self._written):
+            return
+        with SqlCursor(self) as sql:
+            if filepaths:
+                sql.execute("CREATE TEMP TABLE IF NOT EXISTS removed\
+                             (filepath TEXT PRIMARY KEY)")
+                sql.executemany("INSERT OR IGNORE INTO removed\
+                                 (filepath) VALUES (?)",
+                                [(filepath,) for filepath in filepaths])
+                sql.execute("DELETE FROM tags WHERE filepath IN\
+                             (SELECT filepath FROM removed)")
+                sql.execute("DROP TABLE removed")
+            if self._written:
+                result = sql.execute("SELECT COUNT(1) FROM tags")
+                v = result.fetchone()
+                if v is not None and v[0] > self._max_size:
+                    sql.execute("DELETE FROM tags WHERE rowid IN (\
+                                    SELECT rowid FROM tags\
+                                    ORDER BY ctime LIMIT ?)",
+                                (v[0] - self._max_size,))
+                self._written = 0
+            sql.commit()
+
+    def get_cursor(self):
+        """
+            Return a new sqlite cursor
+        """
+        try:
+            return sqlite3.connect(self.DB_PATH, 600.0)
+        except:
+            exit(-1)
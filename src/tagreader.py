@@ -15,11 +15,14 @@ gi.require_version('GstPbutils', '1.0')
 from gi.repository import GLib, Gst, GstPbutils
 
 import os
+from queue import Queue, Empty, Full
+from threading import Thread
 
 from gettext import gettext as _
 
 from lollypop.define import Lp, Type
 from lollypop.utils import format_artist_name
+from lollypop.tagreader_headers import HeaderReader
 
 
 class TagReader:
@@ -38,7 +41,8 @@ class TagReader:
             Init discover
         """
         GstPbutils.pb_utils_init()
-        self._tagreader = GstPbutils.Discoverer.new(10*Gst.SECOND)
+        timeout = Lp().settings.get_value('discover-timeout').get_int32()
+        self._tagreader = GstPbutils.Discoverer.new(timeout*Gst.SECOND)
 
     def get_infos(self, path):
         """
@@ -52,16 +56,165 @@ class TagReader:
         return infos
 
 
+class TagReaderPool:
+    """
+        Read tags on a pool of worker threads,
+        each worker owning its own discoverer
+    """
+    # Results waiting for the consumer, per worker
+    _BACKLOG = 32
+
+    def __init__(self, count=0, scheduler=None):
+        """
+            Init pool
+            @param count as int, workers count, 0 for one per cpu
+            @param scheduler as ScanScheduler, paces workers if not None
+        """
+        if count <= 0:
+            count = os.cpu_count() or 1
+        self._count = count
+        self._scheduler = scheduler
+        self._filepaths = Queue()
+        self._results = Queue(count * self._BACKLOG)
+        self._threads = []
+        self._stopped = False
+
+    def start(self, filepaths):
+        """
+            Start reading tags for filepaths
+            @param filepaths as [str]
+        """
+        for filepath in filepaths:
+            self._filepaths.put(filepath)
+        for i in range(0, self._count):
+            self._filepaths.put(None)
+        for i in range(0, self._count):
+            thread = Thread(target=self._run)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def get_results(self):
+        """
+            Yield results as workers produce them
+            @return iterator of (filepath as str,
+                                 fields as {str: value}/None,
+                                 error as Exception/None)
+            See ScannerTagReader.get_fields()
+        """
+        finished = 0
+        while finished < self._count and not self._stopped:
+            result = self._results.get()
+            if result is None:
+                finished += 1
+            else:
+                yield result
+
+    def stop(self):
+        """
+            Stop workers, pending files are dropped
+        """
+        self._stopped = True
+        try:
+            while True:
+                self._filepaths.get_nowait()
+        except Empty:
+            pass
+        # Sentinels have been dropped too, workers waiting for a file
+        # must still find one
+        for i in range(0, self._count):
+            self._filepaths.put(None)
+
+#######################
+# PRIVATE             #
+#######################
+    def _run(self):
+        """
+            Worker loop: read tags until a None filepath is found
+            @thread safe
+        """
+        reader = ScannerTagReader()
+        if self._scheduler is not None:
+            self._scheduler.set_idle_priority()
+        while not self._stopped:
+            filepath = self._filepaths.get()
+            if filepath is None:
+                break
+            if self._scheduler is not None:
+                self._scheduler.throttle()
+            try:
+                infos = reader.get_scan_infos(filepath)
+                fields = reader.get_fields(infos, filepath)
+                error = None
+            except Exception as e:
+                fields = None
+                error = e
+            self._put((filepath, fields, error))
+        self._put(None)
+
+    def _put(self, result):
+        """
+            Queue result, give up if pool is stopped
+            @param result as (str, {str: value}, Exception)
+        """
+        while not self._stopped:
+            try:
+                self._results.put(result, timeout=0.5)
+                break
+            except Full:
+                pass
+
+
 class ScannerTagReader(TagReader):
     """
         Scanner tag reader
     """
+    # Fields needed by scanner, see get_fields()
+    FIELDS = ['title', 'artists', 'sortname', 'album_artist', 'album_name',
+              'genres', 'discnumber', 'tracknumber', 'year', 'duration']
 
     def __init__(self):
         """
             Init tag reader
         """
         TagReader.__init__(self)
+        self._header_reader = HeaderReader()
+
+    def get_scan_infos(self, path):
+        """
+            Return informations on file at path, read from headers
+            when possible, else from discoverer
+            @param path as str
+            @Exception GLib.Error, Exception on discoverer timeout
+            @return HeaderInfos/GstPbutils.DiscovererInfo
+        """
+        infos = self._header_reader.get_infos(path)
+        if infos is None:
+            infos = self.get_infos(path)
+            if infos.get_result() == GstPbutils.DiscovererResult.TIMEOUT:
+                raise Exception("Discoverer timeout")
+        return infos
+
+    def get_fields(self, infos, filepath):
+        """
+            Return fields needed by scanner
+            @param infos as HeaderInfos/GstPbutils.DiscovererInfo
+            @param filepath as string
+            @return {field as str: value} or None if no infos
+        """
+        if infos is None:
+            return None
+        tags = infos.get_tags()
+        return {'title': self.get_title(tags, filepath),
+                'artists': self.get_artists(tags),
+                'sortname': self.get_artist_sortname(tags),
+                'album_artist': self.get_album_artist(tags),
+                'album_name': self.get_album_name(tags),
+                'genres': self.get_genres(tags),
+                'discnumber': self.get_discnumber(tags),
+                'tracknumber': self.get_tracknumber(tags),
+                'year': self.get_year(tags),
+                'duration': int(infos.get_duration()/1000000000)}
 
     def get_title(self, tags, filepath):
         """
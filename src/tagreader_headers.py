@@ -0,0 +1,693 @@
+# Copyright (c) 2014-2015 Cedric Bellegarde <cedric.bellegarde@adishatz.org>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import re
+import struct
+
+from lollypop.utils import debug
+
+
+# ID3v1 genres, used by ID3v2 "(n)" references and MP4 gnre atoms
+ID3_GENRES = [
+    "Blues", "Classic Rock", "Country", "Dance", "Disco", "Funk", "Grunge",
+    "Hip-Hop", "Jazz", "Metal", "New Age", "Oldies", "Other", "Pop", "R&B",
+    "Rap", "Reggae", "Rock", "Techno", "Industrial", "Alternative", "Ska",
+    "Death Metal", "Pranks", "Soundtrack", "Euro-Techno", "Ambient",
+    "Trip-Hop", "Vocal", "Jazz+Funk", "Fusion", "Trance", "Classical",
+    "Instrumental", "Acid", "House", "Game", "Sound Clip", "Gospel", "Noise",
+    "Alternative Rock", "Bass", "Soul", "Punk", "Space", "Meditative",
+    "Instrumental Pop", "Instrumental Rock", "Ethnic", "Gothic", "Darkwave",
+    "Techno-Industrial", "Electronic", "Pop-Folk", "Eurodance", "Dream",
+    "Southern Rock", "Comedy", "Cult", "Gangsta", "Top 40", "Christian Rap",
+    "Pop/Funk", "Jungle", "Native American", "Cabaret", "New Wave",
+    "Psychedelic", "Rave", "Showtunes", "Trailer", "Lo-Fi", "Tribal",
+    "Acid Punk", "Acid Jazz", "Polka", "Retro", "Musical", "Rock & Roll",
+    "Hard Rock", "Folk", "Folk-Rock", "National Folk", "Swing",
+    "Fast Fusion", "Bebob", "Latin", "Revival", "Celtic", "Bluegrass",
+    "Avantgarde", "Gothic Rock", "Progressive Rock", "Psychedelic Rock",
+    "Symphonic Rock", "Slow Rock", "Big Band", "Chorus", "Easy Listening",
+    "Acoustic", "Humour", "Speech", "Chanson", "Opera", "Chamber Music",
+    "Sonata", "Symphony", "Booty Bass", "Primus", "Porn Groove", "Satire",
+    "Slow Jam", "Club", "Tango", "Samba", "Folklore", "Ballad",
+    "Power Ballad", "Rhythmic Soul", "Freestyle", "Duet", "Punk Rock",
+    "Drum Solo", "A Cappella", "Euro-House", "Dance Hall", "Goa",
+    "Drum & Bass", "Club-House", "Hardcore", "Terror", "Indie", "BritPop",
+    "Negerpunk", "Polsk Punk", "Beat", "Christian Gangsta Rap",
+    "Heavy Metal", "Black Metal", "Crossover", "Contemporary Christian",
+    "Christian Rock", "Merengue", "Salsa", "Thrash Metal", "Anime", "JPop",
+    "Synthpop"]
+
+
+class HeaderDate:
+    """
+        Minimal GLib.Date replacement
+    """
+
+    def __init__(self, year):
+        """
+            Init date
+            @param year as int
+        """
+        self._year = year
+
+    def get_year(self):
+        """
+            Return year
+            @return int
+        """
+        return self._year
+
+
+class HeaderTagList:
+    """
+        Subset of Gst.TagList API used by ScannerTagReader getters
+    """
+
+    def __init__(self):
+        """
+            Init tag list
+        """
+        self._tags = {}
+
+    def add(self, name, value):
+        """
+            Append value for tag name
+            @param name as str, a Gst tag name
+            @param value as str/int
+        """
+        if value is None or value == "":
+            return
+        if name in self._tags:
+            self._tags[name].append(value)
+        else:
+            self._tags[name] = [value]
+
+    def get_tag_size(self, name):
+        """
+            Return values count for tag
+            @param name as str
+            @return int
+        """
+        return len(self._tags.get(name, []))
+
+    def get_string_index(self, name, index):
+        """
+            Return string value at index
+            @param name as str
+            @param index as int
+            @return (exist as bool, value as str)
+        """
+        values = self._tags.get(name, [])
+        if index < len(values):
+            return (True, values[index])
+        return (False, None)
+
+    def get_uint_index(self, name, index):
+        """
+            Return int value at index
+            @param name as str
+            @param index as int
+            @return (exist as bool, value as int)
+        """
+        return self.get_string_index(name, index)
+
+    def get_date(self, name):
+        """
+            Return date
+            @param name as str
+            @return (exist as bool, HeaderDate)
+        """
+        (exist, year) = self.get_string_index(name, 0)
+        if exist:
+            return (True, HeaderDate(year))
+        return (False, None)
+
+    def get_date_time(self, name):
+        """
+            Dates are always stored as date
+            @param name as str
+            @return (False, None)
+        """
+        return (False, None)
+
+
+class HeaderInfos:
+    """
+        Subset of GstPbutils.DiscovererInfo API used by scanner
+    """
+
+    def __init__(self, tags, duration):
+        """
+            Init infos
+            @param tags as HeaderTagList
+            @param duration as float, seconds
+        """
+        self._tags = tags
+        self._duration = duration
+
+    def get_tags(self):
+        """
+            Return tags
+            @return HeaderTagList
+        """
+        return self._tags
+
+    def get_duration(self):
+        """
+            Return duration in nanoseconds, like GStreamer
+            @return int
+        """
+        return int(self._duration * 1000000000)
+
+
+class HeaderReader:
+    """
+        Read tags and duration from file headers for common formats
+        (MP3 with ID3v2, FLAC, Ogg Vorbis/Opus, MP4), without
+        decoding anything
+    """
+    _VORBIS_TAGS = {'TITLE': 'title',
+                    'ARTIST': 'artist',
+                    'ARTISTSORT': 'artist-sortname',
+                    'ALBUMARTIST': 'album-artist',
+                    'ALBUM ARTIST': 'album-artist',
+                    'ALBUM': 'album',
+                    'GENRE': 'genre',
+                    'TRACKNUMBER': 'track-number',
+                    'DISCNUMBER': 'album-disc-number',
+                    'DATE': 'date'}
+    _ID3_TAGS = {'TIT2': 'title', 'TT2': 'title',
+                 'TPE1': 'artist', 'TP1': 'artist',
+                 'TSOP': 'artist-sortname', 'TSP': 'artist-sortname',
+                 'TPE2': 'album-artist', 'TP2': 'album-artist',
+                 'TALB': 'album', 'TAL': 'album',
+                 'TCON': 'genre', 'TCO': 'genre',
+                 'TRCK': 'track-number', 'TRK': 'track-number',
+                 'TPOS': 'album-disc-number', 'TPA': 'album-disc-number',
+                 'TDRC': 'date', 'TYER': 'date', 'TYE': 'date'}
+    _MP4_TAGS = {b'\xa9nam': 'title',
+                 b'\xa9ART': 'artist',
+                 b'soar': 'artist-sortname',
+                 b'aART': 'album-artist',
+                 b'\xa9alb': 'album',
+                 b'\xa9gen': 'genre',
+                 b'\xa9day': 'date'}
+    # Samples per frame for MPEG version (1, 2 and 2.5) and layer (I-III)
+    _MPEG_SAMPLES = {1: [384, 1152, 1152], 2: [384, 1152, 576]}
+    _MPEG_RATES = {1: [44100, 48000, 32000],
+                   2: [22050, 24000, 16000],
+                   25: [11025, 12000, 8000]}
+    _MPEG_BITRATES = {(1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288,
+                               320, 352, 384, 416, 448],
+                      (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160,
+                               192, 224, 256, 320, 384],
+                      (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128,
+                               160, 192, 224, 256, 320],
+                      (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144,
+                               160, 176, 192, 224, 256],
+                      (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96,
+                               112, 128, 144, 160],
+                      (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96,
+                               112, 128, 144, 160]}
+
+    def get_infos(self, path):
+        """
+            Return informations on file at path
+            @param path as str
+            @return HeaderInfos or None if format is unsupported
+                    or headers can't be parsed
+        """
+        try:
+            with open(path, 'rb') as f:
+                magic = f.read(12)
+                f.seek(0)
+                if magic[0:4] == b'fLaC':
+                    return self._read_flac(f)
+                elif magic[0:4] == b'OggS':
+                    return self._read_ogg(f)
+                elif magic[4:8] == b'ftyp':
+                    return self._read_mp4(f)
+                elif magic[0:3] == b'ID3':
+                    return self._read_mp3(f)
+        except Exception as e:
+            debug("HeaderReader::get_infos(): %s, %s" % (path, e))
+        return None
+
+#######################
+# PRIVATE             #
+#######################
+    def _read(self, f, size):
+        """
+            Read exactly size bytes
+            @param f as file
+            @param size as int
+            @return bytes
+            @raise EOFError
+        """
+        data = f.read(size)
+        if len(data) != size:
+            raise EOFError("Truncated file")
+        return data
+
+    def _add_number(self, tags, name, value):
+        """
+            Add a "n" or "n/total" number to tags
+            @param tags as HeaderTagList
+            @param name as str
+            @param value as str
+        """
+        match = re.match(r"\s*(\d+)", value)
+        if match is not None:
+            tags.add(name, int(match.group(1)))
+
+    def _add_year(self, tags, value):
+        """
+            Add year from a date string
+            @param tags as HeaderTagList
+            @param value as str
+        """
+        match = re.match(r"\s*(\d{4})", value)
+        if match is not None:
+            tags.add('date', int(match.group(1)))
+
+    def _add_value(self, tags, name, value):
+        """
+            Add a value, converting numbers and dates
+            @param tags as HeaderTagList
+            @param name as str
+            @param value as str
+        """
+        if name in ['track-number', 'album-disc-number']:
+            self._add_number(tags, name, value)
+        elif name == 'date':
+            if tags.get_tag_size('date') == 0:
+                self._add_year(tags, value)
+        else:
+            tags.add(name, value.strip("\x00"))
+
+    def _parse_vorbis_comment(self, data, tags):
+        """
+            Parse a vorbis comment block
+            @param data as bytes
+            @param tags as HeaderTagList
+        """
+        (length,) = struct.unpack_from("<I", data, 0)
+        offset = 4 + length
+        (count,) = struct.unpack_from("<I", data, offset)
+        offset += 4
+        for i in range(0, count):
+            (length,) = struct.unpack_from("<I", data, offset)
+            offset += 4
+            comment = data[offset:offset + length].decode('utf-8', 'replace')
+            offset += length
+            if "=" not in comment:
+                continue
+            (key, value) = comment.split("=", 1)
+            name = self._VORBIS_TAGS.get(key.upper(), None)
+            if name is not None:
+                self._add_value(tags, name, value)
+
+    def _read_flac(self, f):
+        """
+            Read FLAC metadata blocks
+            @param f as file
+            @return HeaderInfos
+        """
+        self._read(f, 4)
+        tags = HeaderTagList()
+        duration = None
+        last = False
+        while not last:
+            header = self._read(f, 4)
+            last = header[0] & 0x80
+            block_type = header[0] & 0x7f
+            length = int.from_bytes(header[1:4], 'big')
+            if block_type == 0:
+                data = self._read(f, length)
+                rate = int.from_bytes(data[10:13], 'big') >> 4
+                samples = int.from_bytes(data[13:18], 'big') & 0xfffffffff
+                if rate and samples:
+                    duration = samples / rate
+            elif block_type == 4:
+                self._parse_vorbis_comment(self._read(f, length), tags)
+            else:
+                f.seek(length, os.SEEK_CUR)
+        if duration is None:
+            raise Exception("No duration in STREAMINFO")
+        return HeaderInfos(tags, duration)
+
+    def _get_ogg_packets(self, f, count):
+        """
+            Return first packets of first logical stream
+            @param f as file
+            @param count as int
+            @return [bytes]
+        """
+        packets = []
+        packet = b''
+        serial = None
+        while len(packets) < count:
+            header = self._read(f, 27)
+            if header[0:4] != b'OggS':
+                raise Exception("Bad Ogg page")
+            (page_serial,) = struct.unpack_from("<I", header, 14)
+            segments = self._read(f, header[26])
+            data = self._read(f, sum(segments))
+            if serial is None:
+                serial = page_serial
+            elif page_serial != serial:
+                continue
+            offset = 0
+            for segment in segments:
+                packet += data[offset:offset + segment]
+                offset += segment
+                if segment < 255:
+                    packets.append(packet)
+                    packet = b''
+        return packets[0:count]
+
+    def _get_ogg_granule(self, f):
+        """
+            Return granule position of last page
+            @param f as file
+            @return int
+        """
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - 65536))
+        data = f.read()
+        offset = data.rfind(b'OggS')
+        if offset == -1 or offset + 14 > len(data):
+            raise Exception("No last Ogg page")
+        (granule,) = struct.unpack_from("<q", data, offset + 6)
+        return granule
+
+    def _read_ogg(self, f):
+        """
+            Read Ogg Vorbis/Opus headers
+            @param f as file
+            @return HeaderInfos
+        """
+        tags = HeaderTagList()
+        (ident, comment) = self._get_ogg_packets(f, 2)
+        if ident[0:7] == b'\x01vorbis' and comment[0:7] == b'\x03vorbis':
+            (rate,) = struct.unpack_from("<I", ident, 12)
+            skip = 0
+            self._parse_vorbis_comment(comment[7:], tags)
+        elif ident[0:8] == b'OpusHead' and comment[0:8] == b'OpusTags':
+            rate = 48000
+            (skip,) = struct.unpack_from("<H", ident, 10)
+            self._parse_vorbis_comment(comment[8:], tags)
+        else:
+            raise Exception("Unsupported Ogg codec")
+        granule = self._get_ogg_granule(f)
+        if rate == 0 or granule <= skip:
+            raise Exception("Bad Ogg granule")
+        return HeaderInfos(tags, (granule - skip) / rate)
+
+    def _get_id3_text(self, data):
+        """
+            Decode an ID3v2 text frame
+            @param data as bytes
+            @return [str]
+        """
+        encoding = data[0]
+        if encoding == 0:
+            text = data[1:].decode('latin-1')
+        elif encoding == 1:
+            text = data[1:].decode('utf-16')
+        elif encoding == 2:
+            text = data[1:].decode('utf-16-be')
+        else:
+            text = data[1:].decode('utf-8')
+        return [value for value in text.split("\x00") if value]
+
+    def _get_id3_genres(self, value):
+        """
+            Resolve ID3v1 genre references: "(17)", "(17)Rock", "17"
+            @param value as str
+            @return [str]
+        """
+        genres = []
+        for (index, name) in re.findall(r"\((\d+)\)([^(]*)", value):
+            if name:
+                genres.append(name)
+            elif int(index) < len(ID3_GENRES):
+                genres.append(ID3_GENRES[int(index)])
+        if genres or value.startswith("("):
+            return genres
+        if value.isdigit() and int(value) < len(ID3_GENRES):
+            return [ID3_GENRES[int(value)]]
+        return [value]
+
+    def _read_id3(self, f, tags):
+        """
+            Read ID3v2 tag
+            @param f as file
+            @param tags as HeaderTagList
+            @return tag size as int
+        """
+        header = self._read(f, 10)
+        version = header[3]
+        flags = header[5]
+        size = self._get_syncsafe(header[6:10])
+        if version not in [2, 3, 4] or flags & 0x80:
+            raise Exception("Unsupported ID3v2 tag")
+        data = self._read(f, size)
+        offset = 0
+        if flags & 0x40:
+            if version == 3:
+                offset = 4 + struct.unpack_from(">I", data, 0)[0]
+            else:
+                offset = self._get_syncsafe(data[0:4])
+        id_size = 3 if version == 2 else 4
+        header_size = 6 if version == 2 else 10
+        while offset + header_size <= size:
+            frame_id = data[offset:offset + id_size]
+            if frame_id[0:1] == b'\x00':
+                break
+            if version == 2:
+                length = int.from_bytes(data[offset + 3:offset + 6], 'big')
+                frame_flags = 0
+            elif version == 3:
+                (length, frame_flags) = struct.unpack_from(">IH", data,
+                                                           offset + 4)
+            else:
+                length = self._get_syncsafe(data[offset + 4:offset + 8])
+                (frame_flags,) = struct.unpack_from(">H", data, offset + 8)
+            offset += header_size
+            frame = data[offset:offset + length]
+            offset += length
+            name = self._ID3_TAGS.get(frame_id.decode('latin-1'), None)
+            if name is None or not frame:
+                continue
+            # Compressed, encrypted or unsynchronised frames
+            if (version == 3 and frame_flags & 0x00c0) or\
+                    (version == 4 and frame_flags & 0x000e):
+                raise Exception("Unsupported ID3v2 frame")
+            if version == 4 and frame_flags & 0x0001:
+                frame = frame[4:]
+            for value in self._get_id3_text(frame):
+                if name == 'genre':
+                    for genre in self._get_id3_genres(value):
+                        tags.add('genre', genre)
+                else:
+                    self._add_value(tags, name, value)
+        return size + 10
+
+    def _get_syncsafe(self, data):
+        """
+            Decode a 4 bytes syncsafe integer
+            @param data as bytes
+            @return int
+        """
+        return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+    def _read_mp3(self, f):
+        """
+            Read ID3v2 tag and MPEG audio headers
+            @param f as file
+            @return HeaderInfos
+        """
+        tags = HeaderTagList()
+        start = self._read_id3(f, tags)
+        f.seek(start)
+        data = f.read(65536)
+        offset = 0
+        while True:
+            offset = data.find(b'\xff', offset)
+            if offset == -1 or offset + 4 > len(data):
+                raise Exception("No MPEG frame")
+            if data[offset + 1] & 0xe0 == 0xe0:
+                break
+            offset += 1
+        (header,) = struct.unpack_from(">I", data, offset)
+        version_bits = (header >> 19) & 3
+        layer = 4 - ((header >> 17) & 3)
+        bitrate_index = (header >> 12) & 0xf
+        rate_index = (header >> 10) & 3
+        mono = (header >> 6) & 3 == 3
+        if version_bits == 1 or layer == 4 or rate_index == 3 or\
+                bitrate_index in [0, 15]:
+            raise Exception("Bad MPEG frame")
+        version = {3: 1, 2: 2, 0: 25}[version_bits]
+        rate = self._MPEG_RATES[version][rate_index]
+        samples = self._MPEG_SAMPLES[min(version, 2)][layer - 1]
+        # Xing/Info header, after side informations
+        if version == 1:
+            xing = offset + 4 + (17 if mono else 32)
+        else:
+            xing = offset + 4 + (9 if mono else 17)
+        if data[xing:xing + 4] in [b'Xing', b'Info']:
+            (flags,) = struct.unpack_from(">I", data, xing + 4)
+            if flags & 1:
+                (frames,) = struct.unpack_from(">I", data, xing + 8)
+                return HeaderInfos(tags, frames * samples / rate)
+        # VBRI header, 32 bytes after frame header
+        vbri = offset + 36
+        if data[vbri:vbri + 4] == b'VBRI':
+            (frames,) = struct.unpack_from(">I", data, vbri + 14)
+            return HeaderInfos(tags, frames * samples / rate)
+        # CBR
+        bitrate = self._MPEG_BITRATES[(min(version, 2),
+                                       layer)][bitrate_index] * 1000
+        f.seek(0, os.SEEK_END)
+        size = f.tell() - start - offset
+        f.seek(-128, os.SEEK_END)
+        if f.read(3) == b'TAG':
+            size -= 128
+        return HeaderInfos(tags, size * 8 / bitrate)
+
+    def _get_mp4_atoms(self, f, end):
+        """
+            Iterate over atoms until end
+            @param f as file
+            @param end as int
+            @return iterator of (type as bytes, data start as int,
+                                 data end as int)
+        """
+        position = f.tell()
+        while position + 8 <= end:
+            f.seek(position)
+            (size, atom_type) = struct.unpack(">I4s", self._read(f, 8))
+            start = position + 8
+            if size == 1:
+                (size,) = struct.unpack(">Q", self._read(f, 8))
+                start += 8
+            elif size == 0:
+                size = end - position
+            if size < start - position:
+                raise Exception("Bad MP4 atom")
+            yield (atom_type, start, position + size)
+            position += size
+
+    def _read_mp4(self, f):
+        """
+            Read MP4 moov atom
+            @param f as file
+            @return HeaderInfos
+        """
+        tags = HeaderTagList()
+        duration = None
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(0)
+        for (atom_type, start, end) in self._get_mp4_atoms(f, size):
+            if atom_type != b'moov':
+                continue
+            f.seek(start)
+            moov = self._read(f, end - start)
+            duration = self._get_mp4_duration(moov)
+            ilst = self._find_mp4_atom(moov, [b'udta', b'meta', b'ilst'])
+            if ilst is not None:
+                self._parse_mp4_ilst(ilst, tags)
+            break
+        if duration is None:
+            raise Exception("No MP4 duration")
+        return HeaderInfos(tags, duration)
+
+    def _get_mp4_children(self, data):
+        """
+            Iterate over atoms in data
+            @param data as bytes
+            @return iterator of (type as bytes, payload as bytes)
+        """
+        offset = 0
+        while offset + 8 <= len(data):
+            (size, atom_type) = struct.unpack_from(">I4s", data, offset)
+            if size < 8:
+                break
+            yield (atom_type, data[offset + 8:offset + size])
+            offset += size
+
+    def _find_mp4_atom(self, data, path):
+        """
+            Return payload of atom at path
+            @param data as bytes
+            @param path as [bytes]
+            @return bytes or None
+        """
+        for (atom_type, payload) in self._get_mp4_children(data):
+            if atom_type == path[0]:
+                # meta is a full atom: version and flags come first
+                if atom_type == b'meta':
+                    payload = payload[4:]
+                if len(path) == 1:
+                    return payload
+                return self._find_mp4_atom(payload, path[1:])
+        return None
+
+    def _get_mp4_duration(self, moov):
+        """
+            Return duration from mvhd atom
+            @param moov as bytes
+            @return float or None
+        """
+        mvhd = self._find_mp4_atom(moov, [b'mvhd'])
+        if mvhd is None:
+            return None
+        if mvhd[0] == 1:
+            (timescale, duration) = struct.unpack_from(">IQ", mvhd, 20)
+        else:
+            (timescale, duration) = struct.unpack_from(">II", mvhd, 12)
+        if timescale == 0:
+            return None
+        return duration / timescale
+
+    def _parse_mp4_ilst(self, ilst, tags):
+        """
+            Parse iTunes metadata items
+            @param ilst as bytes
+            @param tags as HeaderTagList
+        """
+        for (atom_type, payload) in self._get_mp4_children(ilst):
+            data = self._find_mp4_atom(payload, [b'data'])
+            if data is None or len(data) < 8:
+                continue
+            value = data[8:]
+            if atom_type in [b'trkn', b'disk']:
+                if len(value) >= 4:
+                    (number,) = struct.unpack_from(">H", value, 2)
+                    if number:
+                        tags.add('track-number' if atom_type == b'trkn'
+                                 else 'album-disc-number', number)
+            elif atom_type == b'gnre':
+                if len(value) >= 2:
+                    (index,) = struct.unpack_from(">H", value, 0)
+                    if 0 < index <= len(ID3_GENRES):
+                        tags.add('genre', ID3_GENRES[index - 1])
+            else:
+                name = self._MP4_TAGS.get(atom_type, None)
+                if name is not None:
+                    self._add_value(tags, name,
+                                    value.decode('utf-8', 'replace'))
@@ -66,9 +66,7 @@ def is_audio(f):
         info = f.query_info('standard::content-type',
                             Gio.FileQueryInfoFlags.NONE)
         if info is not None:
-            if info.get_content_type()[0:6] == "audio/" or\
-               info.get_content_type() == "video/mp4":
-                return True
+            return is_audio_type(info.get_content_type())
     except:
         pass
     return False
@@ -83,14 +81,29 @@ def is_pls(f):
         info = f.query_info('standard::content-type',
                             Gio.FileQueryInfoFlags.NONE)
         if info is not None:
-            if info.get_content_type() in ["audio/x-mpegurl",
-                                           "application/xspf+xml"]:
-                return True
+            return is_pls_type(info.get_content_type())
     except:
         pass
     return False
 
 
+def is_audio_type(content_type):
+    """
+        Return True if content type is audio
+        @param content_type as str
+    """
+    return content_type is not None and\
+        (content_type[0:6] == "audio/" or content_type == "video/mp4")
+
+
+def is_pls_type(content_type):
+    """
+        Return True if content type is a playlist
+        @param content_type as str
+    """
+    return content_type in ["audio/x-mpegurl", "application/xspf+xml"]
+
+
 def format_artist_name(name):
     """
         Return formated artist name
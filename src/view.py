@@ -32,8 +32,8 @@ class View(Gtk.Grid):
                                                    self._on_current_changed)
         self._cover_signal = Lp().art.connect('album-artwork-changed',
                                               self._on_cover_changed)
-        self._scan_signal = Lp().scanner.connect('album-modified',
-                                                 self._on_album_modified)
+        self._scan_signal = Lp().scanner.connect('albums-modified',
+                                                 self._on_albums_modified)
 
         # Stop populate thread
         self._stop = False
@@ -62,6 +62,13 @@ class View(Gtk.Grid):
     def populate(self):
         pass
 
+    def is_empty(self):
+        """
+            True if view has no children
+            @return bool
+        """
+        return not self._get_children()
+
 #######################
 # PRIVATE             #
 #######################
@@ -113,12 +120,13 @@ class View(Gtk.Grid):
         """
         GLib.idle_add(self._update_widgets, self._get_children())
 
-    def _on_album_modified(self, scanner, album_id):
+    def _on_albums_modified(self, scanner, album_ids):
         """
-            On album modified, disable it
+            On albums modified, disable them
             @param scanner as CollectionScanner
-            @param album id as int
+            @param album ids as [int]
         """
+        album_ids = set(album_ids)
         for child in self._get_children():
-            if album_id == child.get_id():
+            if child.get_id() in album_ids:
                 child.set_sensitive(False)
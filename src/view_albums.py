@@ -108,7 +108,7 @@ class AlbumsView(View):
     def populate(self, albums):
         """
             Populate albums
-            @param is compilation as bool
+            @param albums as [Album]
         """
         # Add first album to get album size,
         # used to precalculate next albums size
@@ -159,7 +159,7 @@ class AlbumsView(View):
         """
             Add albums to the view
             Start lazy loading
-            @param [album ids as int]
+            @param [Album]
         """
         if albums and not self._stop:
             widget = AlbumSimpleWidget(albums.pop(0),
@@ -17,6 +17,7 @@ from threading import Thread
 from lollypop.view import View
 from lollypop.view_container import ViewContainer
 from lollypop.define import Lp, Type
+from lollypop.objects import Album
 from lollypop.widgets_album import AlbumDetailedWidget
 
 
@@ -48,6 +49,7 @@ class ArtistAlbumsView(View):
     def populate(self, albums):
         """
             Populate the view
+            @param albums as [Album]
         """
         if albums:
             self._add_albums(albums)
@@ -66,11 +68,10 @@ class ArtistAlbumsView(View):
         """
             Pop an album and add it to the view,
             repeat operation until album list is empty
-            @param [album ids as int]
+            @param [Album]
         """
         size_group = Gtk.SizeGroup(mode=Gtk.SizeGroupMode.HORIZONTAL)
         widget = AlbumDetailedWidget(albums.pop(0),
-                                     self._genre_id,
                                      self._artist_id is not None,
                                      size_group)
         widget.connect('finished', self._on_album_finished, albums)
@@ -84,7 +85,7 @@ class ArtistAlbumsView(View):
         """
             Add another album
             @param album as AlbumDetailedWidget
-            @param [album ids as int]
+            @param [Album]
         """
         if albums and not self._stop:
             self._add_albums(albums)
@@ -117,7 +118,7 @@ class CurrentArtistAlbumsView(ViewContainer):
                 albums = self._get_albums(artist_id)
             else:
                 albums = [album_id]
-            GLib.idle_add(self._populate, albums)
+            GLib.idle_add(self._populate, Album.from_ids(albums))
 
 #######################
 # PRIVATE             #
@@ -132,7 +133,7 @@ class CurrentArtistAlbumsView(ViewContainer):
     def _populate(self, albums):
         """
             Populate view and make it visible
-            @param albums as [albums ids as int]
+            @param albums as [Album]
         """
         view = ArtistAlbumsView(None, None)
         view.show()
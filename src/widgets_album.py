@@ -21,7 +21,6 @@ from lollypop.objects import Track
 from lollypop.widgets_rating import RatingWidget
 from lollypop.pop_menu import AlbumMenu
 from lollypop.pop_covers import CoversPopover
-from lollypop.objects import Album
 
 
 class AlbumWidget:
@@ -29,11 +28,12 @@ class AlbumWidget:
         Base album widget
     """
 
-    def __init__(self, album_id, genre_id=None):
+    def __init__(self, album):
         """
             Init widget
+            @param album as Album
         """
-        self._album = Album(album_id, genre_id)
+        self._album = album
         self._selected = None
         self._stop = False
         self._cover = None
@@ -152,10 +152,10 @@ class AlbumSimpleWidget(Gtk.Frame, AlbumWidget):
         Album widget showing cover, artist and title
     """
 
-    def __init__(self, album_id, width=0, height=0):
+    def __init__(self, album, width=0, height=0):
         """
             Init simple album widget
-            @param album id as int
+            @param album as Album
             @param width request as int
             @param height request as int
         """
@@ -163,7 +163,9 @@ class AlbumSimpleWidget(Gtk.Frame, AlbumWidget):
         Gtk.Frame.__init__(self)
         self.set_shadow_type(Gtk.ShadowType.NONE)
         self.get_style_context().add_class('loading')
-        self._album_id = album_id
+        self._album_id = album.id
+        # Widget state is set by init_widget()
+        self._pending = album
         self._album = None
         self._width = width
         if width != 0 and height != 0:
@@ -174,7 +176,7 @@ class AlbumSimpleWidget(Gtk.Frame, AlbumWidget):
             Init widget content
         """
         self.get_style_context().remove_class('loading')
-        AlbumWidget.__init__(self, self._album_id)
+        AlbumWidget.__init__(self, self._pending)
         self._widget = Gtk.EventBox()
         self._widget.set_property('has-tooltip', True)
         grid = Gtk.Grid()
@@ -267,17 +269,15 @@ class AlbumDetailedWidget(Gtk.Bin, AlbumWidget):
         'finished': (GObject.SignalFlags.RUN_FIRST, None, ())
     }
 
-    def __init__(self, album_id, genre_id, pop_allowed, size_group):
+    def __init__(self, album, pop_allowed, size_group):
         """
             Init detailed album widget
-            @param album id as int
-            @param genre id as int
-            @param parent width as int
+            @param album as Album
             @param pop_allowed as bool if widget can show popovers
             @param size group as Gtk.SizeGroup
         """
         Gtk.Bin.__init__(self)
-        AlbumWidget.__init__(self, album_id, genre_id=genre_id)
+        AlbumWidget.__init__(self, album)
         self._pop_allowed = pop_allowed
         builder = Gtk.Builder()
         builder.add_from_resource('/org/gnome/Lollypop/%s.ui' %
@@ -291,7 +291,7 @@ class AlbumDetailedWidget(Gtk.Bin, AlbumWidget):
         self._artist_label = builder.get_object('artist')
 
         label = builder.get_object('duration')
-        duration = Lp().albums.get_duration(album_id, genre_id)
+        duration = Lp().albums.get_duration(album.id, album.genre_id)
         hours = int(duration / 3600)
         mins = int(duration / 60)
         if hours > 0:
@@ -15,6 +15,7 @@ from gi.repository import Gtk, Gdk
 from lollypop.define import Type, Lp
 from lollypop.pop_infos import InfosPopover
 from lollypop.widgets_album import AlbumDetailedWidget
+from lollypop.objects import Album
 
 
 class AlbumContextWidget(AlbumDetailedWidget):
@@ -31,7 +32,7 @@ class AlbumContextWidget(AlbumDetailedWidget):
             @param pop_allowed as bool if widget can show popovers
             @param size group as Gtk.SizeGroup
         """
-        AlbumDetailedWidget.__init__(self, album_id, genre_id,
+        AlbumDetailedWidget.__init__(self, Album(album_id, genre_id),
                                      pop_allowed, size_group)
         self._artist_label.set_text(self._album.artist_name)
         self._artist_label.show()
@@ -14,6 +14,7 @@ from gi.repository import Gtk, Gdk
 
 from lollypop.define import Lp, ArtSize, Type
 from lollypop.widgets_album import AlbumWidget
+from lollypop.objects import Album
 from lollypop.pop_radio import RadioPopover
 
 
@@ -29,7 +30,7 @@ class RadioWidget(Gtk.Bin, AlbumWidget):
             @param radios_manager as RadiosManager
         """
         Gtk.Bin.__init__(self)
-        AlbumWidget.__init__(self, None)
+        AlbumWidget.__init__(self, Album())
         builder = Gtk.Builder()
         builder.add_from_resource('/org/gnome/Lollypop/RadioWidget.ui')
         builder.connect_signals(self)